@@ -0,0 +1,2 @@
+# Modules shared by the labs (random streams, result sinks and stores, caching, profiling, benchmarking and
+# replications); lab-specific values such as the constants are passed in by the caller
@@ -0,0 +1,74 @@
+# Benchmark harness shared by the labs: runs each workload in a fresh process and compares the results against a
+# stored baseline
+
+import json
+import resource
+import subprocess
+import sys
+import time
+
+
+# Returns the peak resident set size of the current process in MB
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB on Linux
+    return rss / (1024.0 * 1024) if sys.platform == 'darwin' else rss / 1024.0
+
+
+# Runs a workload, where run() returns the number of events (or frames) it processed, and returns its measurements
+def measure(run):
+    start = time.perf_counter()
+    count = run()
+    wall_time = time.perf_counter() - start
+    return {
+        'wall_time': wall_time,
+        'count': count,
+        'rate': count / wall_time if wall_time > 0 else 0.0,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+# Runs a benchmark script in a fresh process (so peak RSS covers only that workload) and returns the measurements it
+# prints as JSON on its last line of output
+def run_in_subprocess(script, args):
+    output = subprocess.run([sys.executable, script] + args, check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# Compares results against a baseline and returns a description of each workload whose wall time or peak RSS grew by
+# more than the tolerance (a fraction of the baseline value)
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        for metric in ['wall_time', 'peak_rss_mb']:
+            before = baseline[name][metric]
+            after = result[metric]
+            if before > 0 and after > before * (1 + tolerance):
+                regressions.append('{}: {} {:.3f} -> {:.3f} (+{:.0%})'.format(name, metric, before, after,
+                                                                             after / before - 1))
+    return regressions
+
+
+# Prints a table of results
+def print_results(results):
+    print('{:<40} {:>10} {:>12} {:>14} {:>10}'.format('workload', 'wall (s)', 'count', 'rate (/s)', 'RSS (MB)'))
+    for name, result in sorted(results.items()):
+        print('{:<40} {:>10.3f} {:>12} {:>14.0f} {:>10.1f}'.format(name, result['wall_time'], result['count'],
+                                                                   result['rate'], result['peak_rss_mb']))
+
+
+# Writes results to a JSON file
+def save_results(results, file):
+    with open(file, 'w') as output_file:
+        json.dump(results, output_file, indent=2, sort_keys=True)
+
+    print('Results written to {}'.format(file))
+
+
+# Reads results from a JSON file
+def load_results(file):
+    with open(file) as input_file:
+        return json.load(input_file)
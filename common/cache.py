@@ -0,0 +1,125 @@
+# On-disk cache of simulation results, keyed by the model parameters, constants, seed and code version, with
+# least-recently-used eviction once the cache grows past a size limit (shared by the labs)
+
+import hashlib
+import importlib
+import json
+import os
+
+# Directories of a lab (next to its constants module's package) whose source files make up the code version, along
+# with the modules of this package
+CODE_DIRECTORIES = ['classes', 'utils']
+
+_code_versions = {}
+
+
+##
+# Returns: a hash of the source files of the lab at root and of this package, so results computed by older code are
+# never reused
+#
+def code_version(root):
+    if root not in _code_versions:
+        directories = [os.path.join(root, directory) for directory in CODE_DIRECTORIES]
+        directories.append(os.path.dirname(os.path.abspath(__file__)))
+        digest = hashlib.sha1()
+        for directory in directories:
+            for name in sorted(os.listdir(directory)):
+                if name.endswith('.py'):
+                    with open(os.path.join(directory, name), 'rb') as source_file:
+                        digest.update(name.encode())
+                        digest.update(source_file.read())
+        _code_versions[root] = digest.hexdigest()
+    return _code_versions[root]
+
+
+##
+# Returns: the current values of a constants module (read on every call, since scripts may change e.g. T at run time)
+#
+def constant_values(constants):
+    return {name: value for name, value in vars(constants).items()
+            if not name.startswith('_') and isinstance(value, (int, float, str))}
+
+
+class ResultCache:
+    # constants is the constants module of the lab whose results are cached: its values are part of every key, and the
+    # lab's source files (found next to it) make up the code version
+    def __init__(self, directory, constants, max_bytes=64 * 1024 * 1024):
+        # One JSON file per result; a file's modification time is refreshed on every hit and is used as its last use
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        # The constants module is kept by name, so the cache can be sent to worker processes with the simulator
+        self.constants_name = constants.__name__
+        self.root = os.path.dirname(os.path.dirname(os.path.abspath(constants.__file__)))
+
+        # Approximate size of the cache (other processes may be adding to it too); checked exactly before evicting
+        self.size = sum(size for _, size, _ in self.entries())
+
+    ##
+    # Returns: the cache key of a result with the given parameters, combined with the constants and code version
+    #
+    def key(self, **params):
+        constants = importlib.import_module(self.constants_name)
+        record = json.dumps({'params': params, 'constants': constant_values(constants),
+                             'code': code_version(self.root)}, sort_keys=True, default=str)
+        return hashlib.sha1(record.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    ##
+    # Returns: the cached result for key, or None if it is not cached
+    #
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path) as cache_file:
+                result = json.load(cache_file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return result
+
+    ##
+    # Caches a result (any JSON-serializable value), evicting the least recently used results if the cache is full
+    #
+    def put(self, key, result):
+        path = self.path(key)
+        temporary_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary_path, 'w') as cache_file:
+            json.dump(result, cache_file, default=lambda value: value.item())
+        os.replace(temporary_path, path)
+
+        self.size += os.path.getsize(path)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    ##
+    # Returns: (path, size, last use time) of every cached result
+    #
+    def entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((os.path.join(self.directory, name), stat.st_size, stat.st_mtime))
+        return entries
+
+    ##
+    # Removes the least recently used results until the cache is within max_bytes
+    #
+    def evict(self):
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        self.size = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.size -= size
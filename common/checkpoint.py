@@ -0,0 +1,89 @@
+# On-disk store of finished sweep points and snapshots of running simulations, so an interrupted sweep can resume
+# (shared by the labs)
+
+import hashlib
+import json
+import os
+import pickle
+
+
+class ResultStore:
+    def __init__(self, path):
+        # Results of the finished points, by key; every point is appended to the file as one JSON line when it finishes
+        self.path = path
+        self.results = {}
+
+        if os.path.exists(path):
+            with open(path, 'r+') as store_file:
+                contents = store_file.read()
+                # Drop a last line cut short by a crash, so the next record starts on its own line
+                if not contents.endswith('\n'):
+                    contents = contents[:contents.rfind('\n') + 1]
+                    store_file.seek(len(contents))
+                    store_file.truncate()
+            for line in contents.splitlines():
+                record = json.loads(line)
+                self.results[record['key']] = record['result']
+
+    ##
+    # Returns: the key of a point, built from its parameters (any JSON-serializable values)
+    #
+    @staticmethod
+    def key(**params):
+        return json.dumps(params, sort_keys=True, default=str)
+
+    ##
+    # Returns: a short digest of a key that is the same in every process (unlike hash()), e.g. for file names
+    #
+    @staticmethod
+    def digest(key):
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def __contains__(self, key):
+        return key in self.results
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, key):
+        return self.results.get(key)
+
+    ##
+    # Records the result of a finished point and flushes it to disk
+    #
+    def put(self, key, result):
+        self.results[key] = result
+        with open(self.path, 'a') as store_file:
+            store_file.write(json.dumps({'key': key, 'result': result}, default=lambda value: value.item()) + '\n')
+            store_file.flush()
+            os.fsync(store_file.fileno())
+
+
+##
+# Writes a snapshot of a running simulation (any picklable state) to path, replacing the previous one atomically
+#
+def save_snapshot(path, key, state):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as snapshot_file:
+        pickle.dump({'key': key, 'state': state}, snapshot_file, pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+##
+# Returns: the state saved in the snapshot at path, or None if there is no snapshot or it was taken for another key
+#
+def load_snapshot(path, key):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as snapshot_file:
+        snapshot = pickle.load(snapshot_file)
+    return snapshot['state'] if snapshot['key'] == key else None
+
+
+##
+# Removes the snapshot at path (once its simulation has finished)
+#
+def remove_snapshot(path):
+    if os.path.exists(path):
+        os.remove(path)
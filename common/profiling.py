@@ -0,0 +1,128 @@
+# Optional instrumentation (per-phase timers and counters) and profilers for the simulators of every lab
+
+import cProfile
+import pstats
+import signal
+import time
+from collections import defaultdict
+
+
+class Instrumentation:
+    def __init__(self):
+        # Exclusive time spent in each phase (time in nested phases is only counted for the nested phase)
+        self.timings = defaultdict(float)
+        self.counters = defaultdict(int)
+
+        # Stack of [phase name, start time, time spent in nested phases]
+        self.stack = []
+
+    ##
+    # Starts timing a phase; phases may be nested
+    #
+    def start(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    ##
+    # Stops timing the innermost phase
+    #
+    def stop(self):
+        name, start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        self.timings[name] += elapsed - nested
+        if len(self.stack) > 0:
+            self.stack[-1][2] += elapsed
+
+    ##
+    # Adds time measured by the caller to a phase (for hot loops where start/stop would cost too much)
+    #
+    def add_time(self, name, elapsed):
+        self.timings[name] += elapsed
+        if len(self.stack) > 0:
+            self.stack[-1][2] += elapsed
+
+    ##
+    # Increments a counter
+    #
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    ##
+    # Prints the phase timings and counters
+    #
+    def report(self):
+        total = sum(self.timings.values())
+        for name, elapsed in sorted(self.timings.items(), key=lambda item: -item[1]):
+            print('{:<24} {:>10.4f} s {:>6.1%}'.format(name, elapsed, elapsed / total if total > 0 else 0))
+        for name, value in sorted(self.counters.items()):
+            print('{:<24} {:>10}'.format(name, value))
+
+
+# Instrumentation that records nothing, used when instrumentation is turned off
+class NullInstrumentation:
+    def start(self, name):
+        pass
+
+    def stop(self):
+        pass
+
+    def add_time(self, name, elapsed):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def report(self):
+        pass
+
+
+##
+# Runs run() under cProfile and prints the functions with the highest cumulative time
+# Returns: the return value of run()
+#
+def run_cprofile(run, limit=25):
+    profiler = cProfile.Profile()
+    result = profiler.runcall(run)
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(limit)
+    return result
+
+
+##
+# Runs run() under a sampling profiler that records the call stack every interval seconds of CPU time (Unix only),
+# and prints the functions seen most often at the top of the stack (self) and anywhere on it (inclusive)
+# Returns: the return value of run()
+#
+def run_sampling_profile(run, interval=0.001, limit=25):
+    self_samples = defaultdict(int)
+    inclusive_samples = defaultdict(int)
+    total = [0]
+
+    def sample(signum, frame):
+        total[0] += 1
+        seen = set()
+        is_top = True
+        while frame is not None:
+            code = frame.f_code
+            key = '{}:{}({})'.format(code.co_filename, code.co_firstlineno, code.co_name)
+            if is_top:
+                self_samples[key] += 1
+                is_top = False
+            if key not in seen:
+                inclusive_samples[key] += 1
+                seen.add(key)
+            frame = frame.f_back
+
+    previous_handler = signal.signal(signal.SIGPROF, sample)
+    signal.setitimer(signal.ITIMER_PROF, interval, interval)
+    try:
+        result = run()
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, previous_handler)
+
+    print('{} samples every {} s'.format(total[0], interval))
+    for title, samples in [('self', self_samples), ('inclusive', inclusive_samples)]:
+        print('Top functions ({}):'.format(title))
+        for key, count in sorted(samples.items(), key=lambda item: -item[1])[:limit]:
+            print('{:>7.1%}  {}'.format(count * 1.0 / max(total[0], 1), key))
+
+    return result
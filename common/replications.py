@@ -0,0 +1,54 @@
+# Replication runner with confidence intervals and early stopping, shared by the labs
+
+import math
+import statistics
+
+import numpy as np
+
+# Two-sided 95% Student t critical values by degrees of freedom (the normal value is used above 30)
+T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+# Returns the half-width of the 95% confidence interval of the mean of samples
+def half_width(samples):
+    if len(samples) < 2:
+        return math.inf
+    df = len(samples) - 1
+    t = T_95[df - 1] if df <= len(T_95) else 1.96
+    return t * statistics.stdev(samples) / math.sqrt(len(samples))
+
+
+# Returns whether the confidence interval is narrow enough: within target of the mean, or within the absolute
+# tolerance for metrics whose mean is (close to) zero
+def converged(mean, width, target, tolerance):
+    return width <= target * abs(mean) or width <= tolerance
+
+
+# Runs independent replications of run(seed_sequence), which returns a list of metric values, until the 95% confidence
+# interval of every metric is within target (relative half-width) or max_replications is reached.
+# Replications are run in batches, across the executor's processes if one is given.
+# Returns: (means, half_widths, replications)
+def run_replications(run, seed=None, min_replications=5, max_replications=50, target=0.05, tolerance=1e-6,
+                     executor=None, batch_size=1):
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    samples = []
+
+    while len(samples) < max_replications:
+        count = max(batch_size, min_replications - len(samples))
+        count = min(count, max_replications - len(samples))
+        children = seed_sequence.spawn(count)
+        if executor is None:
+            samples += [run(child) for child in children]
+        else:
+            samples += list(executor.map(run, children))
+
+        if len(samples) >= min_replications:
+            widths = [half_width(metric) for metric in zip(*samples)]
+            means = [statistics.mean(metric) for metric in zip(*samples)]
+            if all(converged(m, w, target, tolerance) for m, w in zip(means, widths)):
+                break
+
+    columns = list(zip(*samples))
+    return [statistics.mean(metric) for metric in columns], [half_width(metric) for metric in columns], len(samples)
@@ -0,0 +1,101 @@
+# Reproducible, splittable random number streams, shared by the labs
+
+import numpy as np
+
+# Named streams, in the order of their spawn keys (appending names keeps existing streams unchanged)
+STREAMS = ('arrivals', 'service', 'observers', 'backoff', 'traffic', 'routing')
+
+# Number of variates pre-drawn per buffered block
+BUFFER_SIZE = 4096
+
+
+class RandomStream:
+    def __init__(self, seed_sequence):
+        # NumPy generator for block draws
+        self.generator = np.random.default_rng(seed_sequence)
+
+        # Pre-drawn standard exponential and uniform variates served one at a time
+        self.exponentials = []
+        self.exponential_index = 0
+        self.uniforms = []
+        self.uniform_index = 0
+
+        # Pre-drawn unit-mean variates of the stream's source (see sample)
+        self.samples = []
+        self.sample_index = 0
+
+    ##
+    # Returns an exponential random variable, served from a pre-drawn block
+    # Parameters: mean -> the mean of the exponential distribution
+    #
+    def exponential(self, mean):
+        if self.exponential_index == len(self.exponentials):
+            self.exponentials = self.generator.standard_exponential(BUFFER_SIZE).tolist()
+            self.exponential_index = 0
+        value = self.exponentials[self.exponential_index]
+        self.exponential_index += 1
+        return mean * value
+
+    ##
+    # Returns a random variable from a source (see utils.sources), served from a pre-drawn block of unit-mean variates
+    # A stream should always be sampled from the same source
+    # Parameters: source -> the source whose distribution is drawn from
+    #             mean -> the mean of the distribution
+    #
+    def sample(self, source, mean):
+        if self.sample_index == len(self.samples):
+            self.samples = source.draw(self.generator, 1.0, BUFFER_SIZE).tolist()
+            self.sample_index = 0
+        value = self.samples[self.sample_index]
+        self.sample_index += 1
+        return mean * value
+
+    ##
+    # Returns a uniform random variable in [0, 1), served from a pre-drawn block
+    #
+    def random(self):
+        if self.uniform_index == len(self.uniforms):
+            self.uniforms = self.generator.random(BUFFER_SIZE).tolist()
+            self.uniform_index = 0
+        value = self.uniforms[self.uniform_index]
+        self.uniform_index += 1
+        return value
+
+    ##
+    # Returns a random integer in [0, n)
+    #
+    def randbelow(self, n):
+        return int(self.random() * n)
+
+
+class RandomStreams:
+    def __init__(self, seed=None):
+        # Root of the seed tree: an int seed, a SeedSequence (e.g. spawned for a worker), or None for fresh entropy
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.streams = {}
+
+    ##
+    # Returns the SeedSequence of a named stream, optionally split further by index (e.g. one per node)
+    # Keys are derived from the stream name rather than spawn order, so a stream does not depend on which other
+    # streams have been used
+    #
+    def seed_sequence_for(self, name, index=None):
+        spawn_key = self.seed_sequence.spawn_key + (STREAMS.index(name),)
+        if index is not None:
+            spawn_key += (index,)
+        return np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=spawn_key,
+                                      pool_size=self.seed_sequence.pool_size)
+
+    ##
+    # Returns the named stream (created on first use), optionally split further by index
+    #
+    def stream(self, name, index=None):
+        key = (name, index)
+        if key not in self.streams:
+            self.streams[key] = RandomStream(self.seed_sequence_for(name, index))
+        return self.streams[key]
+
+    def __getattr__(self, name):
+        if name in STREAMS:
+            return self.stream(name)
+        raise AttributeError(name)
@@ -0,0 +1,135 @@
+# Result sinks: rows are written as they are produced, as CSV or as a binary .npy table, so neither sweeps nor
+# per-event traces are kept in memory (shared by the labs)
+
+import csv
+import os
+
+import numpy as np
+
+# Smallest size of the .npy header, reserved up front and rewritten with the final row count when the file is closed
+NPY_HEADER_SIZE = 256
+
+
+# Returns the size to reserve for the .npy header of a table with the given columns: room for the fixed keys and each
+# column's ('name', '<type') entry, rounded up to a multiple of 64 as the format requires
+def npy_header_size(headers):
+    size = 96 + sum(len(header) + 16 for header in headers)
+    return max(NPY_HEADER_SIZE, -(-size // 64) * 64)
+
+
+class CsvSink:
+    def __init__(self, path, headers):
+        self.path = path
+        self.file = open(path, mode='w', newline='')
+        self.writer = csv.writer(self.file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        self.writer.writerow(headers)
+
+    def write_row(self, row):
+        self.writer.writerow(row)
+
+    ##
+    # Writes the buffered rows to disk (called after each result row, so finished rows survive a crash)
+    #
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        print('Results written to {}'.format(self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Writes rows to a .npy file holding a structured array with one named field per column, readable with
+# np.load(path)['column'] or np.load(path, mmap_mode='r')
+# Rows are collected in a fixed-size block and appended to the file a block at a time; the column types are taken
+# from the first row (ints as int64, everything else as float64) unless dtypes is given
+class NpySink:
+    def __init__(self, path, headers, dtypes=None, block_size=4096):
+        self.path = path
+        self.headers = headers
+        self.dtype = None if dtypes is None else np.dtype(list(zip(headers, dtypes)))
+        self.block_size = block_size
+        self.block = None
+        self.filled = 0
+        self.rows = 0
+
+        self.file = open(path, 'wb')
+        self.header_size = npy_header_size(headers)
+        self.file.write(b' ' * self.header_size)
+
+    def write_row(self, row):
+        if self.block is None:
+            if self.dtype is None:
+                self.dtype = np.dtype([(header, np.int64 if isinstance(value, (int, np.integer)) else np.float64)
+                                       for header, value in zip(self.headers, row)])
+            self.block = np.empty(self.block_size, dtype=self.dtype)
+
+        self.block[self.filled] = tuple(row)
+        self.filled += 1
+        if self.filled == self.block_size:
+            self.flush()
+
+    ##
+    # Writes a block of rows at once from a structured array with the sink's columns (or, for a single column, an
+    # array of its values), without going through the row block
+    #
+    def write_rows(self, rows):
+        if self.dtype is None:
+            self.dtype = np.dtype([(header, rows.dtype[header]) for header in self.headers] if rows.dtype.names else
+                                  [(self.headers[0], rows.dtype)])
+        self.flush()
+        block = np.empty(len(rows), dtype=self.dtype)
+        if rows.dtype.names:
+            for header in self.headers:
+                block[header] = rows[header]
+        else:
+            block[self.headers[0]] = rows
+        self.file.write(block.tobytes())
+        self.rows += len(rows)
+
+    ##
+    # Appends the rows collected so far to the file
+    #
+    def flush(self):
+        if self.filled > 0:
+            self.file.write(self.block[:self.filled].tobytes())
+            self.rows += self.filled
+            self.filled = 0
+        self.file.flush()
+
+    ##
+    # Writes the remaining rows, then the .npy header with the final number of rows
+    #
+    def close(self):
+        self.flush()
+        dtype = self.dtype if self.dtype is not None else np.dtype([(header, np.float64) for header in self.headers])
+        header = "{{'descr': {!r}, 'fortran_order': False, 'shape': ({},), }}".format(
+            np.lib.format.dtype_to_descr(dtype), self.rows)
+        header = header.ljust(self.header_size - 11) + '\n'
+        if len(header) > self.header_size - 10:
+            raise ValueError('Too many columns for the .npy header: {}'.format(self.headers))
+
+        self.file.seek(0)
+        self.file.write(b'\x93NUMPY\x01\x00' + (self.header_size - 10).to_bytes(2, 'little') + header.encode('latin1'))
+        self.file.close()
+        print('Results written to {}'.format(self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+##
+# Returns: a sink writing to path, as a .npy table if path ends in .npy and as CSV otherwise
+#
+def open_sink(path, headers, dtypes=None):
+    if os.path.splitext(path)[1] == '.npy':
+        return NpySink(path, headers, dtypes)
+    return CsvSink(path, headers)
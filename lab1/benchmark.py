@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+# Benchmarks the EventQueue engines on standard M/M/1 and M/M/1/K workloads, and on non-exponential arrival and service
+# sources
+
+import argparse
+import json
+import sys
+
+from classes.event_queue import EventQueue
+from common import benchmark
+from utils import constants as c, sources
+
+# Standard workloads: name -> (rho, K, arrival source, service source)
+WORKLOADS = {
+    'mm1-rho0.25': (0.25, None, None, None),
+    'mm1-rho0.95': (0.95, None, None, None),
+    'mm1k-K10-rho1.5': (1.5, 10, None, None),
+    'mm1k-K50-rho1.5': (1.5, 50, None, None),
+    'md1-rho0.95': (0.95, None, None, 'deterministic'),
+    'pareto-mg1-rho0.95': (0.95, None, 'pareto:1.5', 'bimodal')
+}
+
+MODES = [c.MODE_EVENT, c.MODE_VECTORIZED, c.MODE_ANALYTIC, c.MODE_STREAM, c.MODE_SCHEDULER]
+
+
+# Runs a single workload and returns the number of events processed
+def run_workload(workload, mode, seed):
+    rho, K, arrivals, service = WORKLOADS[workload]
+    event_queue = EventQueue(rho, rho, 0.1, K, mode=mode, seed=seed,
+                             arrivals=arrivals and sources.parse_source(arrivals),
+                             service=service and sources.parse_source(service))
+    event_queue.run_des()
+    return sum(event_queue.last_counts.values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--workloads', nargs='+', choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    parser.add_argument('--T', type=float, default=100, help='simulation time of each workload')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='benchmark.json', help='file to save the results to')
+    parser.add_argument('--baseline', default=None, help='results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fraction by which wall time or peak RSS may exceed the baseline')
+    parser.add_argument('--workload', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    c.T = args.T
+
+    # Child process: run one workload and print its measurements
+    if args.workload:
+        result = benchmark.measure(lambda: run_workload(args.workload, args.modes[0], args.seed))
+        print(json.dumps(result))
+        sys.exit()
+
+    results = {}
+    for workload in args.workloads:
+        for mode in args.modes:
+            name = '{}/{}'.format(workload, mode)
+            print('Running', name)
+            results[name] = benchmark.run_in_subprocess(__file__, [
+                '--workload', workload, '--modes', mode, '--T', str(args.T), '--seed', str(args.seed)])
+
+    benchmark.print_results(results)
+    benchmark.save_results(results, args.output)
+
+    if args.baseline:
+        regressions = benchmark.find_regressions(results, benchmark.load_results(args.baseline), args.tolerance)
+        for regression in regressions:
+            print('Regression:', regression)
+        sys.exit(1 if regressions else 0)
@@ -1,21 +1,63 @@
+import os
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from copy import copy
+from functools import partial
+import numpy as np
 from numpy import arange
 
-from utils import constants as c, utils
+from utils import constants as c, sources, utils
+from common import checkpoint
+from common.profiling import Instrumentation, NullInstrumentation
+from common.replications import run_replications
+from common.rng import RandomStreams
 from classes.events import ArrivalEvent, DepartureEvent, ObserverEvent
+from classes.queue_statistics import QueueStatistics
+from classes.scheduler import Scheduler
+from classes.timeline import Timeline
+
+# Attributes holding the state of a rho point while its events are processed (saved in snapshots)
+SNAPSHOT_STATE = ['events', 'timeline', 'scheduler', 'arrival_rate', 'observer_rate', 'counts',
+                  'cumulative_idle_time', 'idle_start', 'loss_count', 'timer', 'curr_service_timer', 'packet_buffer',
+                  'queue_size', 'queue_size_sum', 'time_average_queue_size', 'streams', 'arrival_source',
+                  'service_source']
 
 
 class EventQueue:
-    def __init__(self, min_rho, max_rho, step_size, max_queue_size=None):
+    def __init__(self, min_rho, max_rho, step_size, max_queue_size=None, mode=c.MODE_EVENT, seed=None, servers=1,
+                 instrument=False, snapshot_dir=None, snapshot_interval=None, cache=None,
+                 trace=None, arrivals=None, service=None):
         # Initialize rho range, optional max queue size (for M/M/1/K)
         self.min_rho = min_rho
         self.max_rho = max_rho
         self.step_size = step_size
         self.max_queue_size = max_queue_size
 
-        # The queue of events
+        # Number of servers (only the scheduler mode supports more than one, for M/M/c)
+        # rho is the load per server, so the arrival rate is scaled by the number of servers
+        self.servers = servers
+
+        # Event generation mode, and the random streams for arrivals, service lengths and observers
+        # Each rho point reseeds the streams from its own SeedSequence spawned from the seed (an int, or a SeedSequence
+        # from spawn_seeds when several EventQueues are swept together)
+        self.mode = mode
+        self.seed = seed
+        self.streams = RandomStreams(seed)
+
+        # Sources of the inter-arrival times and packet lengths (see utils.sources), exponential unless given, e.g. a
+        # DeterministicSource of lengths for M/D/1 or a TraceSource of recorded arrivals; observers stay exponential
+        self.arrival_source = arrivals or sources.EXPONENTIAL
+        self.service_source = service or sources.EXPONENTIAL
+
+        # The queue of events (per-object mode), the typed-array timeline (vectorized mode) and the heap of
+        # scheduled events (scheduler mode)
         self.events = deque()
+        self.timeline = Timeline()
+        self.scheduler = Scheduler()
+
+        # Arrival and observer rates of the current iteration (used by the scheduler mode to draw the next event)
+        self.arrival_rate = 0
+        self.observer_rate = 0
 
         # Counts for each event type (N_a, N_d, N_o)
         self.counts = {
@@ -24,8 +66,7 @@ class EventQueue:
             c.EVENT_OBSERVER: 0
         }
 
-        # Other counts/timers (idle time, dropped packets)
-        self.idle_time = 0
+        # Other counts/timers (idle time, start of the current idle period, dropped packets)
         self.cumulative_idle_time = 0
         self.idle_start = 0
         self.loss_count = 0
@@ -34,47 +75,212 @@ class EventQueue:
         self.timer = 0 # Current simulation time
         self.curr_service_timer = 0 # Tracks the departure of the previous packet (used to calculate current departure)
 
+        # Departure times of the packets in the buffer, carried between windows by the array engines
+        self.packet_buffer = deque()
+
         # Current size of the packet queue
         self.queue_size = 0
 
         # Sum of queue sizes recorded at observation events (used to calculate E[N])
         self.queue_size_sum = 0
 
+        # Exact time-average queue size (only computed in analytic mode)
+        self.time_average_queue_size = None
+
+        # Event counts of the last completed rho point (kept after its events are released)
+        self.last_counts = None
+
+        # Per-phase timers and counters, accumulated over all rho points (a no-op unless instrument is set)
+        self.instrumentation = Instrumentation() if instrument else NullInstrumentation()
+
+        # Directory to save a snapshot of each rho point to every snapshot_interval seconds of simulated time while its
+        # events are processed (event, vectorized and scheduler modes), so an interrupted point resumes from the last
+        # snapshot instead of starting over
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_interval = snapshot_interval
+
+        # Optional ResultCache of finished rho points (only used with a seed, since unseeded points never repeat)
+        self.cache = cache
+
+        # Optional sink that a (rho, time, queue size) row is written to after every processed event (event,
+        # vectorized and scheduler modes; the sink stays in this process, so traced sweeps must run serially)
+        if trace is not None and mode in (c.MODE_ANALYTIC, c.MODE_STREAM):
+            raise ValueError('The {} mode does not process individual events, so it cannot be traced'.format(mode))
+        self.trace = trace
+
     ##
     # Runs the DES using the current EventQueue parameters (rho range and max queue size)
-    # Parameters: none
-    # Returns: none
+    # Parameters: workers -> number of worker processes to spread the rho points across (serial if None or 1)
+    #             store -> optional ResultStore of finished points (see run_sweeps)
+    #             sink -> optional result sink the rows are written to as the points finish
+    # Returns: results -> the metrics for each rho point, in rho order
     #
-    def run_des(self):
-        results = []
-        for rho in arange(self.min_rho, self.max_rho + 0.05, self.step_size):
-            # Reset the DES for each iteration
-            self.clean_des()
+    def run_des(self, workers=None, store=None, sink=None):
+        return run_sweeps([self], workers, store, sink)
 
-            # Calculate rates for event inter-arrivals
-            lam = rho * c.C / c.L
-            a = lam * 5
+    ##
+    # Returns: the rho values swept by this EventQueue, paired with an independent seed for each
+    #
+    def sweep_points(self):
+        rhos = arange(self.min_rho, self.max_rho + 0.05, self.step_size)
+        # A copy of a SeedSequence seed is spawned from, so every call returns the same seeds
+        if isinstance(self.seed, np.random.SeedSequence):
+            root = np.random.SeedSequence(self.seed.entropy, spawn_key=self.seed.spawn_key)
+        else:
+            root = np.random.SeedSequence(self.seed)
+        return list(zip(rhos, root.spawn(len(rhos))))
+
+    ##
+    # Runs the DES for a single rho point
+    # Parameters: rho -> the traffic intensity
+    #             seed_sequence -> the SeedSequence used to seed the random streams for this point
+    # Returns: metrics -> the metrics for this point
+    #
+    def run_point(self, rho, seed_sequence):
+        # Return the cached metrics if this point has been run before
+        cache_key = None
+        if self.cache is not None and self.seed is not None:
+            cache_key = self.cache.key(point=self.point_key(rho, seed_sequence))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                metrics, counts = cached
+                self.last_counts = dict(zip([c.EVENT_ARRIVAL, c.EVENT_DEPARTURE, c.EVENT_OBSERVER], counts))
+                self.instrumentation.count('cache hits')
+                return metrics
+
+        # Reset the DES for each iteration
+        self.clean_des()
+        self.streams = RandomStreams(seed_sequence)
+        self.arrival_source.start(self.streams.arrivals.generator)
+        self.service_source.start(self.streams.service.generator)
+
+        # Calculate rates for event inter-arrivals
+        lam = rho * self.servers * c.C / c.L
+        a = lam * 5
+
+        # Resume from a snapshot of this point if there is one, otherwise populate the event queue
+        snapshot_key = self.point_key(rho, seed_sequence)
+        if self.snapshot_dir is not None and self.restore_snapshot(snapshot_key):
+            print('Resuming rho = {:.2f} from t = {}'.format(rho, self.timer))
+        else:
+            self.populate(lam, a)
+
+        # While there are still events to process and the simulation is not complete, process the next event
+        self.instrumentation.start('processing')
+        if self.snapshot_dir is None and self.trace is None:
+            while self.has_next_event() and self.timer < c.T:
+                self.process_next_event()
+        else:
+            next_snapshot = np.inf if self.snapshot_dir is None else self.timer + self.snapshot_interval
+            while self.has_next_event() and self.timer < c.T:
+                self.process_next_event()
+                if self.trace is not None and self.timer < c.T:
+                    self.trace.write_row((rho, self.timer, self.queue_size))
+                if self.timer >= next_snapshot:
+                    self.save_snapshot(snapshot_key)
+                    next_snapshot = self.timer + self.snapshot_interval
+        if self.mode not in (c.MODE_ANALYTIC, c.MODE_STREAM) and self.queue_size == 0:
+            self.end_idle_period(c.T)
+        self.instrumentation.stop()
+
+        # Compute metrics
+        self.instrumentation.start('metrics')
+        metrics = self.compute_results(rho, self.max_queue_size)
+        self.instrumentation.stop()
+
+        self.instrumentation.count('arrivals', self.counts[c.EVENT_ARRIVAL])
+        self.instrumentation.count('departures', self.counts[c.EVENT_DEPARTURE])
+        self.instrumentation.count('observers', self.counts[c.EVENT_OBSERVER])
+        self.instrumentation.count('drops', self.loss_count)
+
+        if self.snapshot_dir is not None:
+            checkpoint.remove_snapshot(self.snapshot_path(snapshot_key))
+
+        # Release the events before the EventQueue is sent back from a worker process
+        self.last_counts = dict(self.counts)
+        self.clean_des()
+
+        if cache_key is not None:
+            event_types = [c.EVENT_ARRIVAL, c.EVENT_DEPARTURE, c.EVENT_OBSERVER]
+            self.cache.put(cache_key, [metrics, [self.last_counts[event_type] for event_type in event_types]])
+        return metrics
 
-            # Populate the event queue
+    ##
+    # Generates the events of a rho point (or, in the analytic and stream modes, computes its statistics directly)
+    # Parameters: lam -> the arrival rate
+    #             a -> the observer rate
+    # Returns: none
+    #
+    def populate(self, lam, a):
+        self.instrumentation.start('generation')
+        if self.mode == c.MODE_ANALYTIC:
+            self.compute_statistics(lam, a)
+        elif self.mode == c.MODE_STREAM:
+            self.stream_statistics(lam, a)
+        elif self.mode == c.MODE_VECTORIZED:
+            self.populate_timeline(lam, a)
+        elif self.mode == c.MODE_SCHEDULER:
+            self.populate_scheduler(lam, a)
+        else:
             self.generate_arrival_events(lam)
             if self.max_queue_size:
                 self.generate_departure_events_mm1k(self.events)
             else:
                 self.generate_departure_events_mm1(self.events)
             self.generate_observer_events(a)
+        self.queue_size = 0
+        self.instrumentation.stop()
 
-            # While there are still events to process and the simulation is not complete, process the next event
-            self.queue_size = 0
-            while not len(self.events) == 0 and self.timer < c.T:
-                self.process_next_event()
+    ##
+    # Parameters: rho -> the traffic intensity
+    #             seed_sequence -> the SeedSequence of the point (without a seed, its entropy differs on every run, so
+    #                              the point is never found again)
+    #             options -> any other parameters the point's result depends on (e.g. replication options)
+    # Returns: key -> the key identifying a point in a ResultStore or snapshot
+    #
+    def point_key(self, rho, seed_sequence, **options):
+        seed = [seed_sequence.entropy, list(seed_sequence.spawn_key)]
+        return checkpoint.ResultStore.key(K=self.max_queue_size, rho="%.2f" % rho, mode=self.mode, servers=self.servers,
+                                          seed=seed, T=c.T, L=c.L, C=c.C, arrivals=self.arrival_source.key(),
+                                          service=self.service_source.key(), **options)
 
-            # Compute and print metrics
-            metrics = self.compute_results(rho, self.max_queue_size)
-            self.print_results(metrics)
+    ##
+    # Returns: the path of the snapshot file of the point with the given key
+    #
+    def snapshot_path(self, key):
+        return os.path.join(self.snapshot_dir, 'point_{}.pkl'.format(checkpoint.ResultStore.digest(key)))
 
-            results.append(metrics)
+    ##
+    # Saves the state of the current point to its snapshot file
+    # Parameters: key -> the key of the point
+    # Returns: none
+    #
+    def save_snapshot(self, key):
+        state = {name: getattr(self, name) for name in SNAPSHOT_STATE}
+        checkpoint.save_snapshot(self.snapshot_path(key), key, state)
 
-        return results
+    ##
+    # Restores the state of the current point from its snapshot file, if there is one
+    # Parameters: key -> the key of the point
+    # Returns: whether a snapshot was restored
+    #
+    def restore_snapshot(self, key):
+        state = checkpoint.load_snapshot(self.snapshot_path(key), key)
+        if state is None:
+            return False
+        for name, value in state.items():
+            setattr(self, name, value)
+        return True
+
+    ##
+    # Runs a single replication of a rho point
+    # Parameters: rho -> the traffic intensity
+    #             seed_sequence -> the SeedSequence used to seed the random streams for this replication
+    # Returns: values -> the metric values (without K and rho) as floats
+    #
+    def run_replication(self, rho, seed_sequence):
+        metrics = self.run_point(rho, seed_sequence)
+        return [float(m) for m in metrics[2 if self.max_queue_size else 1:]]
 
     ##
     # Resets the EventQueue properties to prepare for the next iteration
@@ -83,23 +289,26 @@ class EventQueue:
     #
     def clean_des(self):
         self.events = deque()
+        self.timeline = Timeline()
+        self.scheduler = Scheduler()
         self.counts = {
             c.EVENT_ARRIVAL: 0,
             c.EVENT_DEPARTURE: 0,
             c.EVENT_OBSERVER: 0
         }
-        self.idle_time = 0
         self.cumulative_idle_time = 0
         self.idle_start = 0
         self.loss_count = 0
         self.timer = 0
         self.curr_service_timer = 0
+        self.packet_buffer = deque()
         self.queue_size = 0
         self.queue_size_sum = 0
+        self.time_average_queue_size = None
 
     ##
     # Generates a list of arrival events and adds it to the events queue
-    # Parameters: lam -> lambda, determines the mean of the exponential distribution
+    # Parameters: lam -> lambda, the arrival rate (the inverse of the mean inter-arrival time)
     # Returns: none (modifies events queue)
     #
     def generate_arrival_events(self, lam):
@@ -107,13 +316,134 @@ class EventQueue:
         arrival_events = deque()
 
         while curr_time < c.T:
-            inter_arrival_time = utils.get_random_variable(1 / lam)
+            inter_arrival_time = utils.get_random_variable(1 / lam, self.streams.arrivals, self.arrival_source)
             curr_time += inter_arrival_time
 
             arrival_events.append(ArrivalEvent(curr_time))
 
         self.merge_into_events_queue(arrival_events)
 
+    ##
+    # Generates the sorted arrival times in vectorized blocks
+    # Parameters: lam -> lambda, the arrival rate (the inverse of the mean inter-arrival time)
+    # Returns: arrival_times -> NumPy array of arrival times in [0, T)
+    #
+    def generate_arrival_times(self, lam):
+        return utils.generate_event_times(self.streams.arrivals.generator, 1 / lam, c.T, source=self.arrival_source)
+
+    ##
+    # Generates the sorted observer times in vectorized blocks
+    # Parameters: a -> alpha, determines the mean of the exponential distribution
+    # Returns: observer_times -> NumPy array of observer times in [0, T)
+    #
+    def generate_observer_times(self, a):
+        return utils.generate_event_times(self.streams.observers.generator, 1 / a, c.T)
+
+    ##
+    # Generates the arrival, departure and observer times and merges them into the timeline in one pass
+    # Parameters: lam -> lambda, the arrival rate
+    #             a -> alpha, the observer rate
+    # Returns: none (modifies the timeline)
+    #
+    def populate_timeline(self, lam, a):
+        arrival_times = self.generate_arrival_times(lam)
+        if self.max_queue_size:
+            departure_times, _ = self.generate_departure_times_mm1k(arrival_times)
+        else:
+            departure_times = self.generate_departure_times_mm1(arrival_times)
+        observer_times = self.generate_observer_times(a)
+
+        self.instrumentation.start('merge')
+        self.timeline.merge((arrival_times, c.EVENT_ARRIVAL),
+                            (departure_times, c.EVENT_DEPARTURE),
+                            (observer_times, c.EVENT_OBSERVER))
+        self.instrumentation.stop()
+
+    ##
+    # Schedules the first arrival and observer events; every later event is scheduled while the queue is simulated
+    # Parameters: lam -> lambda, the arrival rate
+    #             a -> alpha, the observer rate
+    # Returns: none (modifies the scheduler)
+    #
+    def populate_scheduler(self, lam, a):
+        self.arrival_rate = lam
+        self.observer_rate = a
+        self.scheduler.schedule(utils.get_random_variable(1 / lam, self.streams.arrivals, self.arrival_source),
+                                c.EVENT_ARRIVAL)
+        self.scheduler.schedule(utils.get_random_variable(1 / a, self.streams.observers), c.EVENT_OBSERVER)
+
+    ##
+    # Schedules the departure of a packet that starts service
+    # Parameters: start_time -> the time at which the packet starts service
+    # Returns: none (modifies the scheduler)
+    #
+    def schedule_departure(self, start_time):
+        # Service time is the packet length (mean L, drawn from the service source) over the link rate
+        length = utils.get_random_variable(c.L, self.streams.service, self.service_source)
+        self.scheduler.schedule(start_time + length / c.C, c.EVENT_DEPARTURE)
+
+    ##
+    # Computes the metrics directly from the sorted arrival, departure and observer time arrays, without processing
+    # individual events
+    # Parameters: lam -> lambda, the arrival rate
+    #             a -> alpha, the observer rate
+    # Returns: none (updates counters and timers as if the events had been processed)
+    #
+    def compute_statistics(self, lam, a):
+        arrival_times = self.generate_arrival_times(lam)
+        if self.max_queue_size:
+            departure_times, accepted = self.generate_departure_times_mm1k(arrival_times)
+        else:
+            departure_times, accepted = self.generate_departure_times_mm1(arrival_times), None
+        observer_times = self.generate_observer_times(a)
+
+        self.instrumentation.start('statistics')
+        statistics = QueueStatistics()
+        statistics.add_window(arrival_times, accepted, departure_times, observer_times, c.T)
+        self.load_statistics(statistics)
+        self.instrumentation.stop()
+
+    ##
+    # Computes the same metrics as compute_statistics, but generates and processes the events one time window at a
+    # time so that memory stays bounded regardless of T. Only the packets still in the system are carried between
+    # windows.
+    # Parameters: lam -> lambda, the arrival rate
+    #             a -> alpha, the observer rate
+    # Returns: none (updates counters and timers as if the events had been processed)
+    #
+    def stream_statistics(self, lam, a):
+        statistics = QueueStatistics()
+        arrival_windows = utils.generate_event_time_windows(self.streams.arrivals.generator, 1 / lam, c.T,
+                                                            c.STREAM_WINDOW, source=self.arrival_source)
+        observer_windows = utils.generate_event_time_windows(self.streams.observers.generator, 1 / a, c.T,
+                                                             c.STREAM_WINDOW)
+
+        for (window_end, arrival_times), (_, observer_times) in zip(arrival_windows, observer_windows):
+            if self.max_queue_size:
+                departure_times, accepted = self.generate_departure_times_mm1k(arrival_times)
+            else:
+                departure_times, accepted = self.generate_departure_times_mm1(arrival_times), None
+            self.instrumentation.start('statistics')
+            statistics.add_window(arrival_times, accepted, departure_times, observer_times, window_end)
+            self.instrumentation.stop()
+
+        self.load_statistics(statistics)
+
+    ##
+    # Copies the accumulated statistics into the EventQueue counters and timers
+    # Parameters: statistics -> the QueueStatistics accumulated for the current iteration
+    # Returns: none
+    #
+    def load_statistics(self, statistics):
+        self.counts[c.EVENT_ARRIVAL] = statistics.arrival_count
+        self.counts[c.EVENT_DEPARTURE] = statistics.departure_count
+        self.counts[c.EVENT_OBSERVER] = statistics.observer_count
+        self.loss_count = statistics.loss_count
+        self.queue_size_sum = statistics.queue_size_sum
+        self.cumulative_idle_time = statistics.idle_time
+        self.time_average_queue_size = statistics.time_average_queue_size()
+        self.timer = statistics.elapsed
+
     ##
     # Generates a list of departure events based on the arrival events and adds it to the events queue
     # This implementation is for the M/M/1 queue - no need to simulate the packet queue
@@ -126,8 +456,8 @@ class EventQueue:
         departure_events = deque()
 
         for ae in arrival_events:
-            # Service time is determined via an exponential distribution with mean = L
-            length = utils.get_random_variable(c.L)
+            # Service time is the packet length (mean L, drawn from the service source) over the link rate
+            length = utils.get_random_variable(c.L, self.streams.service, self.service_source)
             service_time = length / c.C
 
             # If the next event arrives before the previous one departs, then the departure time of the next event is 
@@ -145,6 +475,20 @@ class EventQueue:
 
         self.merge_into_events_queue(departure_events)
 
+    ##
+    # Generates the departure times for the M/M/1 queue directly from the arrival times, without creating events
+    # The arrivals may be one window of a longer run, following the previous departure in curr_service_timer
+    # Parameters: arrival_times -> sorted array of arrival times
+    # Returns: departure_times -> NumPy array of departure times, one per arrival
+    #
+    def generate_departure_times_mm1(self, arrival_times):
+        # Service time is the packet length (mean L, drawn from the service source) over the link rate
+        service_times = self.service_source.draw(self.streams.service.generator, c.L, len(arrival_times)) / c.C
+        departure_times = utils.lindley_departures(arrival_times, service_times, self.curr_service_timer)
+        if len(departure_times) > 0:
+            self.curr_service_timer = departure_times[-1]
+        return departure_times
+
     ##
     # Generates a list of departure events based on the arrival events and adds it to the events queue
     # This implementation is for the M/M/1/K queue - the packet queue is simulated to determine which events are
@@ -177,19 +521,48 @@ class EventQueue:
                 curr_event = events_queue.popleft()
                 timer = curr_event.event_time
                 # Update the service time of the packet in the queue to represent the amount of service time remaining
-                # from the perspective of the arrival
+                # from the perspective of the arrival (a packet arriving at an empty queue starts its service now)
                 if len(packet_queue) > 0:
                     packet_queue[0] -= timer - service_time_diff
-                    service_time_diff += timer - service_time_diff
+                service_time_diff = timer
                 # If the queue is not full, add the packet
                 if len(packet_queue) < self.max_queue_size:
-                    # Service time is determined via an exponential distribution with mean = L
-                    length = utils.get_random_variable(c.L)
+                    # Service time is the packet length (mean L, drawn from the service source) over the link rate
+                    length = utils.get_random_variable(c.L, self.streams.service, self.service_source)
                     service_time = length / c.C
                     packet_queue.append(service_time)
 
         self.merge_into_events_queue(departure_events)
 
+    ##
+    # Generates the departure times for the M/M/1/K queue directly from the arrival times, without creating events
+    # Only the number of packets in the system is tracked: an arriving packet is dropped if K packets have not yet
+    # departed, otherwise it departs after the previously accepted packet (or on arrival if the server is idle).
+    # The arrivals may be one window of a longer run, continuing from the packet buffer and curr_service_timer.
+    # Parameters: arrival_times -> sorted array of arrival times
+    # Returns: departure_times -> NumPy array of departure times of the accepted packets
+    #          accepted -> boolean array marking which arrivals were accepted
+    #
+    def generate_departure_times_mm1k(self, arrival_times):
+        in_system = self.packet_buffer
+        departure_times = []
+        accepted = np.zeros(len(arrival_times), dtype=bool)
+        prev_departure = self.curr_service_timer
+        for i, arrival_time in enumerate(arrival_times.tolist()):
+            while len(in_system) > 0 and in_system[0] <= arrival_time:
+                in_system.popleft()
+            if len(in_system) < self.max_queue_size:
+                # Service time is the packet length (mean L, drawn from the service source) over the link rate, drawn
+                # only for accepted packets, in the same order as the event and scheduler modes
+                length = utils.get_random_variable(c.L, self.streams.service, self.service_source)
+                prev_departure = max(arrival_time, prev_departure) + length / c.C
+                in_system.append(prev_departure)
+                departure_times.append(prev_departure)
+                accepted[i] = True
+
+        self.curr_service_timer = prev_departure
+        return np.array(departure_times), accepted
+
     ##
     # Generates a list of observer events and adds it to the events queue
     # Parameters: a -> alpha, determines the mean of the exponential distribution
@@ -199,7 +572,7 @@ class EventQueue:
         curr_time = 0
         observer_events = deque()
         while curr_time < c.T:
-            curr_time += utils.get_random_variable(1 / a)
+            curr_time += utils.get_random_variable(1 / a, self.streams.observers)
             observer_events.append(ObserverEvent(curr_time))
 
         self.merge_into_events_queue(observer_events)
@@ -210,6 +583,7 @@ class EventQueue:
     # Returns: none
     #
     def merge_into_events_queue(self, new_events):
+        self.instrumentation.start('merge')
         combined_events = deque()
         while len(self.events) > 0 and len(new_events) > 0:
             if self.events[0].event_time <= new_events[0].event_time:
@@ -221,6 +595,7 @@ class EventQueue:
         else:
             combined_events += new_events
         self.events = combined_events
+        self.instrumentation.stop()
 
     ##
     # Determines which event to process next, updates appropriate counters and timers
@@ -228,57 +603,101 @@ class EventQueue:
     # Returns: none
     #
     def process_next_event(self):
-        curr_event = self.events.popleft()
-        self.timer = curr_event.event_time
+        scheduling = self.mode == c.MODE_SCHEDULER
+        if self.mode == c.MODE_VECTORIZED:
+            event_time, event_type = self.timeline.next_event()
+        elif scheduling:
+            event_time, event_type = self.scheduler.next_event()
+        else:
+            curr_event = self.events.popleft()
+            event_time, event_type = curr_event.event_time, curr_event.event_type
+        self.timer = event_time
+
+        # Events at or after T are outside the simulation (the array modes drop them), so they end it unprocessed
+        if event_time >= c.T:
+            return
 
         # Action is based on event type
-        if curr_event.event_type == c.EVENT_ARRIVAL:
+        if event_type == c.EVENT_ARRIVAL:
+            if scheduling:
+                inter_arrival_time = utils.get_random_variable(1 / self.arrival_rate, self.streams.arrivals,
+                                                               self.arrival_source)
+                next_arrival_time = event_time + inter_arrival_time
+                self.scheduler.schedule(next_arrival_time, c.EVENT_ARRIVAL)
+
+            # An arrival at an empty system ends its idle period
+            if self.queue_size == 0:
+                self.end_idle_period(event_time)
+
             # If the event is an arrival and the packet buffer is full, only increment the loss counter
             if self.max_queue_size and self.queue_size >= self.max_queue_size:
                 self.loss_count += 1
 
-            # Otherwise, add the packet to the buffer
+            # Otherwise, add the packet to the buffer (and start serving it if a server is free)
             else:
                 self.queue_size += 1
-            self.idle_reset(curr_event)
+                if scheduling and self.queue_size <= self.servers:
+                    self.schedule_departure(event_time)
 
-        elif curr_event.event_type == c.EVENT_DEPARTURE:
+        elif event_type == c.EVENT_DEPARTURE:
             self.queue_size -= 1
-            self.idle_reset(curr_event)
+            # The freed server takes the next waiting packet
+            if scheduling and self.queue_size >= self.servers:
+                self.schedule_departure(event_time)
+            # A departure that empties the system starts an idle period
+            if self.queue_size == 0:
+                self.idle_start = event_time
 
         else:
-            # Record the size of the packet queue and increment idle count if necessary
+            if scheduling:
+                inter_observer_time = utils.get_random_variable(1 / self.observer_rate, self.streams.observers)
+                next_observer_time = event_time + inter_observer_time
+                self.scheduler.schedule(next_observer_time, c.EVENT_OBSERVER)
+
+            # Record the size of the packet queue
             self.queue_size_sum += self.queue_size
-            if self.queue_size == 0:
-                self.idle_time = curr_event.event_time - self.idle_start
 
-        self.counts[curr_event.event_type] += 1
+        self.counts[event_type] += 1
+
+    ##
+    # Returns: whether there are events left to process in the current mode
+    #
+    def has_next_event(self):
+        if self.mode == c.MODE_VECTORIZED:
+            return self.timeline.has_next_event()
+        if self.mode == c.MODE_SCHEDULER:
+            return self.scheduler.has_next_event()
+        return len(self.events) > 0
 
     ##
-    # Resets the idle timers
-    # Parameters: event -> the current event
+    # Adds the current idle period (from the departure that emptied the system) to the idle time, counting only the
+    # part before the end of the simulation
+    # Parameters: end_time -> the time the idle period ends
     # Returns: none
     #
-    def idle_reset(self, event):
-        self.cumulative_idle_time += self.idle_time
-        self.idle_time = 0
-        self.idle_start = event.event_time
+    def end_idle_period(self, end_time):
+        self.cumulative_idle_time += max(min(end_time, c.T) - self.idle_start, 0)
 
     ##
     # Computes the metrics for the current iteration
     # Checks whether M/M/1/K-specific metrics should be generated
+    # In analytic mode, the exact time-average E[N] is appended to the metrics
     # Parameters: rho -> the traffic intensity
     #             K -> the max queue size
-    # Returns: metrics -> the corresponding metrics to be returned
+    # Returns: metrics -> the corresponding metrics to be returned ([K,] rho, then the metrics as floats)
     #
     def compute_results(self, rho, K=None):
-        E_N = str(self.queue_size_sum * 1.0 / self.counts[c.EVENT_OBSERVER])
+        E_N = float(self.queue_size_sum * 1.0 / self.counts[c.EVENT_OBSERVER])
         if K:
-            P_LOSS = str(self.loss_count * 1.0 / self.counts[c.EVENT_ARRIVAL])
-            return [str(K), "%.2f" % rho, E_N, P_LOSS]
+            P_LOSS = float(self.loss_count * 1.0 / self.counts[c.EVENT_ARRIVAL])
+            metrics = [int(K), round(float(rho), 2), E_N, P_LOSS]
         else:
-            P_IDLE = str(self.cumulative_idle_time * 1.0 / c.T)
-            return ["%.2f" % rho, E_N, P_IDLE]
+            P_IDLE = float(self.cumulative_idle_time * 1.0 / c.T)
+            metrics = [round(float(rho), 2), E_N, P_IDLE]
+
+        if self.time_average_queue_size is not None:
+            metrics.append(float(self.time_average_queue_size))
+        return metrics
 
     ##
     # Prints the metrics for the current iteration
@@ -286,4 +705,124 @@ class EventQueue:
     # Returns: none
     #
     def print_results(self, metrics):
-        print(', '.join(metrics))
+        print(', '.join(str(metric) for metric in metrics))
+
+
+##
+# Prints the metrics of a finished point and writes them to the sink, if there is one
+# Parameters: event_queue -> the EventQueue the point belongs to
+#             metrics -> the metrics of the point
+#             sink -> the result sink (or None)
+# Returns: none
+#
+def write_results(event_queue, metrics, sink):
+    event_queue.print_results(metrics)
+    if sink is not None:
+        sink.write_row(metrics)
+        sink.flush()
+
+
+##
+# Returns: a seed for each of count EventQueues swept together (e.g. one per K value), spawned from seed, so their
+#          points get independent streams; without a seed, every EventQueue draws fresh entropy (and is not cached)
+#
+def spawn_seeds(seed, count):
+    if seed is None:
+        return [None] * count
+    return np.random.SeedSequence(seed).spawn(count)
+
+
+##
+# Runs the rho sweeps of several EventQueues (e.g. one per K value), optionally spread across a process pool
+# Every rho point is seeded from its own spawned stream, so the results are the same as a serial run
+# Parameters: event_queues -> the EventQueues to sweep
+#             workers -> number of worker processes (serial if None or 1)
+#             store -> optional ResultStore; points already in it are not run again, and every other point is added
+#                      to it as soon as it finishes
+#             sink -> optional result sink the rows are written to, in sweep order, as soon as they are available
+# Returns: results -> the metrics for each point, in the order of the EventQueues and their rho values
+#
+def run_sweeps(event_queues, workers=None, store=None, sink=None):
+    points = [(event_queue, rho, seed_sequence)
+              for event_queue in event_queues for rho, seed_sequence in event_queue.sweep_points()]
+    keys = [event_queue.point_key(rho, seed_sequence) for event_queue, rho, seed_sequence in points]
+
+    results = []
+    if workers is None or workers <= 1:
+        for (event_queue, rho, seed_sequence), key in zip(points, keys):
+            if store is not None and key in store:
+                metrics = store.get(key)
+            else:
+                metrics = event_queue.run_point(rho, seed_sequence)
+                if store is not None:
+                    store.put(key, metrics)
+            write_results(event_queue, metrics, sink)
+            results.append(metrics)
+        return results
+
+    results = [store.get(key) if store is not None else None for key in keys]
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(event_queue.run_point, rho, seed_sequence): index
+                   for index, (event_queue, rho, seed_sequence) in enumerate(points) if results[index] is None}
+        # Save points as they finish, so an interrupted sweep keeps every finished point
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            if store is not None:
+                store.put(keys[index], results[index])
+
+            # Print and write every point up to the first unfinished one, so the output matches a serial run
+            while written < len(points) and results[written] is not None:
+                write_results(points[written][0], results[written], sink)
+                written += 1
+
+    for index in range(written, len(points)):
+        write_results(points[index][0], results[index], sink)
+
+    return results
+
+
+##
+# Runs independent replications of every rho point of several EventQueues, stopping each point early once the 95%
+# confidence interval of every metric is within the target relative half-width
+# Parameters: event_queues -> the EventQueues to sweep
+#             workers -> number of worker processes to run replications in (serial if None or 1)
+#             store -> optional ResultStore; points already in it are not run again, and every other point is added
+#                      to it as soon as it finishes
+#             sink -> optional result sink each point's row is written to as soon as it finishes
+#             options -> replication options passed to run_replications (min/max replications, target, tolerance)
+# Returns: results -> for each point, [K,] rho, then the mean and half-width of each metric, then the replication count
+#
+def run_replicated_sweeps(event_queues, workers=None, store=None, sink=None, **options):
+    executor = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    results = []
+    try:
+        for event_queue in event_queues:
+            for rho, seed_sequence in event_queue.sweep_points():
+                key = event_queue.point_key(rho, seed_sequence, replications=options)
+                if store is not None and key in store:
+                    metrics = store.get(key)
+                    write_results(event_queue, metrics, sink)
+                    results.append(metrics)
+                    continue
+
+                run = partial(event_queue.run_replication, rho)
+                means, half_widths, replications = run_replications(run, seed_sequence, executor=executor,
+                                                                    batch_size=workers or 1, **options)
+
+                metrics = [int(event_queue.max_queue_size)] if event_queue.max_queue_size else []
+                metrics.append(round(float(rho), 2))
+                for mean, half_width in zip(means, half_widths):
+                    metrics += [float(mean), float(half_width)]
+                metrics.append(int(replications))
+
+                write_results(event_queue, metrics, sink)
+                results.append(metrics)
+                if store is not None:
+                    store.put(key, metrics)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return results
@@ -1,19 +1,31 @@
+from utils import constants as c
+
+
+# Events use __slots__ (no per-instance __dict__) and small-int type codes to keep them compact
 class QueueObject:
+    __slots__ = ('event_time', 'event_type')
+
     def __init__(self, event_time, event_type):
         self.event_time = event_time
         self.event_type = event_type
 
 
 class ArrivalEvent(QueueObject):
+    __slots__ = ()
+
     def __init__(self, event_time):
-        super().__init__(event_time, 'a')
+        super().__init__(event_time, c.EVENT_ARRIVAL)
 
 
 class DepartureEvent(QueueObject):
+    __slots__ = ()
+
     def __init__(self, event_time):
-        super().__init__(event_time, 'd')
+        super().__init__(event_time, c.EVENT_DEPARTURE)
 
 
 class ObserverEvent(QueueObject):
+    __slots__ = ()
+
     def __init__(self, event_time):
-        super().__init__(event_time, 'o')
+        super().__init__(event_time, c.EVENT_OBSERVER)
@@ -0,0 +1,281 @@
+from bisect import bisect_right
+from collections import deque
+
+import numpy as np
+
+from utils import constants as c, sources, theory, utils
+from common.rng import RandomStreams
+from classes.scheduler import Scheduler
+
+# Columns of the per-station results
+NETWORK_HEADERS = ['station', 'arrivals', 'departures', 'losses', 'E[N]', 'P_LOSS', 'E[T]', 'utilization']
+
+
+class NetworkQueue:
+    ##
+    # A network of FIFO stations, each a pool of servers with an optional capacity (M/M/c/K), where packets leaving a
+    # station are routed to other stations or leave the network
+    # Parameters: arrival_rates -> the rate of external (Poisson, unless an arrival source is given) arrivals at each
+    #                              station (0 for stations only fed by other stations)
+    #             service_times -> the mean service time at each station
+    #             routing -> routing matrix, where routing[i][j] is the probability that a packet leaving station i
+    #                        goes to station j; the rest of each row leaves the network (no routing if None)
+    #             servers -> the number of servers at each station (or one number for every station)
+    #             capacities -> the number of packets each station can hold, or None for an infinite buffer (or one
+    #                           value for every station)
+    #             mode -> MODE_SCHEDULER to step every station forward on one shared heap of events (any routing), or
+    #                     MODE_ANALYTIC to compute each station's departures from its arrival array in turn
+    #                     (feed-forward networks, where packets only go to higher-numbered stations)
+    #             seed -> seed of the random streams
+    #             arrivals, service -> sources of the inter-arrival and service times (see utils.sources), exponential
+    #                                  unless given; one service source serves every station, scaled to its mean
+    #
+    def __init__(self, arrival_rates, service_times, routing=None, servers=1, capacities=None,
+                 mode=c.MODE_SCHEDULER, seed=None, arrivals=None, service=None):
+        station_count = len(service_times)
+        self.arrival_rates = [float(rate) for rate in arrival_rates]
+        self.service_times = [float(service_time) for service_time in service_times]
+        self.servers = [int(servers)] * station_count if np.isscalar(servers) else [int(n) for n in servers]
+        if capacities is None or np.isscalar(capacities):
+            capacities = [capacities] * station_count
+        self.capacities = [None if capacity is None else int(capacity) for capacity in capacities]
+
+        self.routing = np.zeros((station_count, station_count)) if routing is None else \
+            np.asarray(routing, dtype=np.float64)
+        if np.any(self.routing < 0) or np.any(self.routing.sum(axis=1) > 1 + 1e-9):
+            raise ValueError('Routing probabilities must be non-negative, with each row summing to at most 1')
+        if mode == c.MODE_ANALYTIC and np.any(np.tril(self.routing) > 0):
+            raise ValueError('The analytic mode needs a feed-forward network (packets only go to later stations)')
+
+        # Each station's next stations and the cumulative probabilities of going to them (the remainder leaves)
+        self.next_stations = []
+        self.cumulative_routing = []
+        for row in self.routing:
+            targets = np.flatnonzero(row).tolist()
+            self.next_stations.append(targets)
+            self.cumulative_routing.append(np.cumsum(row[targets]).tolist())
+
+        self.mode = mode
+        self.seed = seed
+        self.arrival_source = arrivals or sources.EXPONENTIAL
+        self.service_source = service or sources.EXPONENTIAL
+
+    def __len__(self):
+        return len(self.service_times)
+
+    ##
+    # Runs the network for T seconds of simulated time
+    # Parameters: sink -> optional result sink each station's row is written to
+    # Returns: results -> one row of NETWORK_HEADERS per station
+    #
+    def run(self, sink=None):
+        streams = RandomStreams(self.seed)
+        self.arrival_source.start(streams.arrivals.generator)
+        self.service_source.start(streams.service.generator)
+        if self.mode == c.MODE_ANALYTIC:
+            statistics = self.run_analytic(streams)
+        else:
+            statistics = self.run_scheduler(streams)
+
+        results = self.compute_results(*statistics)
+        if sink is not None:
+            for row in results:
+                sink.write_row(row)
+            sink.flush()
+        return results
+
+    ##
+    # Steps every station forward on one shared scheduler. An event's type is encoded with its station as
+    # station * 2 + EVENT_ARRIVAL (external arrival) or + EVENT_DEPARTURE, so heap entries stay small, and each
+    # station's state is kept in parallel lists indexed by station. A departing packet's arrival at its next station
+    # is handled at once, without an event of its own.
+    # Parameters: streams -> the RandomStreams of the run
+    # Returns: the per-station statistics (see compute_results)
+    #
+    def run_scheduler(self, streams):
+        station_count = len(self)
+        scheduler = Scheduler()
+
+        # Per-station state: packets in the system, arrival times of the waiting packets, and the time of the last
+        # change in the number of packets
+        in_system = [0] * station_count
+        waiting = [deque() for _ in range(station_count)]
+        last_change = [0.0] * station_count
+
+        # Per-station statistics
+        arrival_counts = [0] * station_count
+        departure_counts = [0] * station_count
+        loss_counts = [0] * station_count
+        area = [0.0] * station_count
+        busy_area = [0.0] * station_count
+        sojourn_sum = [0.0] * station_count
+
+        servers = self.servers
+        capacities = self.capacities
+        service_times = self.service_times
+        service_stream = streams.service
+        service_source = self.service_source
+        routing_stream = streams.routing
+
+        # Starts serving a packet that arrived at arrival_time; packets finishing after T are not counted
+        def start_service(station, time, arrival_time):
+            departure_time = time + service_stream.sample(service_source, service_times[station])
+            scheduler.schedule(departure_time, station * 2 + c.EVENT_DEPARTURE)
+            if departure_time <= c.T:
+                sojourn_sum[station] += departure_time - arrival_time
+
+        # Adds the time since the station's last change to its queue size and busy server integrals
+        def advance(station, time):
+            elapsed = time - last_change[station]
+            area[station] += in_system[station] * elapsed
+            busy_area[station] += min(in_system[station], servers[station]) * elapsed
+            last_change[station] = time
+
+        def arrive(station, time):
+            arrival_counts[station] += 1
+            capacity = capacities[station]
+            if capacity is not None and in_system[station] >= capacity:
+                loss_counts[station] += 1
+                return
+            advance(station, time)
+            in_system[station] += 1
+            if in_system[station] <= servers[station]:
+                start_service(station, time, time)
+            else:
+                waiting[station].append(time)
+
+        arrival_streams = {}
+        for station, rate in enumerate(self.arrival_rates):
+            if rate > 0:
+                arrival_streams[station] = streams.stream('arrivals', station)
+                scheduler.schedule(utils.get_random_variable(1 / rate, arrival_streams[station], self.arrival_source),
+                                   station * 2 + c.EVENT_ARRIVAL)
+
+        while scheduler.has_next_event():
+            time, code = scheduler.next_event()
+            if time >= c.T:
+                break
+            station, event_type = divmod(code, 2)
+
+            if event_type == c.EVENT_ARRIVAL:
+                scheduler.schedule(time + utils.get_random_variable(1 / self.arrival_rates[station],
+                                                                    arrival_streams[station], self.arrival_source),
+                                   code)
+                arrive(station, time)
+            else:
+                departure_counts[station] += 1
+                advance(station, time)
+                in_system[station] -= 1
+                # The freed server takes the next waiting packet
+                if len(waiting[station]) > 0:
+                    start_service(station, time, waiting[station].popleft())
+
+                next_stations = self.next_stations[station]
+                if len(next_stations) > 0:
+                    i = bisect_right(self.cumulative_routing[station], routing_stream.random())
+                    if i < len(next_stations):
+                        arrive(next_stations[i], time)
+
+        for station in range(station_count):
+            advance(station, c.T)
+        return arrival_counts, departure_counts, loss_counts, area, busy_area, sojourn_sum
+
+    ##
+    # Computes each station's departures from its whole arrival array, in station order: a station's arrivals are its
+    # external arrivals merged with the packets routed to it by earlier stations (feed-forward networks only)
+    # Parameters: streams -> the RandomStreams of the run
+    # Returns: the per-station statistics (see compute_results)
+    #
+    def run_analytic(self, streams):
+        station_count = len(self)
+        routed = [[] for _ in range(station_count)]
+        statistics = [[0] * station_count, [0] * station_count, [0] * station_count, [0.0] * station_count,
+                      [0.0] * station_count, [0.0] * station_count]
+        arrival_counts, departure_counts, loss_counts, area, busy_area, sojourn_sum = statistics
+
+        for station in range(station_count):
+            arrival_times = routed[station]
+            if self.arrival_rates[station] > 0:
+                arrival_times.append(utils.generate_event_times(streams.stream('arrivals', station).generator,
+                                                                1 / self.arrival_rates[station], c.T,
+                                                                source=self.arrival_source))
+            routed[station] = None
+            arrival_times = np.sort(np.concatenate(arrival_times)) if len(arrival_times) > 0 else np.empty(0)
+            arrival_times = arrival_times[arrival_times < c.T]
+
+            service = self.service_source.draw(streams.service.generator, self.service_times[station],
+                                               len(arrival_times))
+            departure_times, accepted = utils.fifo_departures(arrival_times, service, self.servers[station],
+                                                              self.capacities[station])
+            arrival_times = arrival_times[accepted]
+            departure_times = departure_times[accepted]
+            ends = np.minimum(departure_times, c.T)
+            starts = np.minimum(departure_times - service[accepted], c.T)
+            finished = departure_times <= c.T
+
+            arrival_counts[station] = len(accepted)
+            loss_counts[station] = len(accepted) - len(arrival_times)
+            departure_counts[station] = int(np.count_nonzero(finished))
+            area[station] = float(np.sum(ends - arrival_times))
+            busy_area[station] = float(np.sum(ends - starts))
+            sojourn_sum[station] = float(np.sum(departure_times[finished] - arrival_times[finished]))
+
+            # Route the departures before T to the next stations (the rest leave the network)
+            next_stations = self.next_stations[station]
+            if len(next_stations) > 0:
+                leaving = np.sort(departure_times[departure_times < c.T])
+                choices = np.searchsorted(self.cumulative_routing[station],
+                                          streams.routing.generator.random(len(leaving)), side='right')
+                for i, next_station in enumerate(next_stations):
+                    routed[next_station].append(leaving[choices == i])
+
+        return statistics
+
+    ##
+    # Computes each station's metrics from the statistics accumulated over [0, T]
+    # E[N] is the exact time-average number of packets at the station, E[T] the mean time spent at the station by
+    # the packets that left it, and utilization the mean fraction of its servers that were busy
+    # Returns: results -> one row of NETWORK_HEADERS per station
+    #
+    def compute_results(self, arrival_counts, departure_counts, loss_counts, area, busy_area, sojourn_sum):
+        results = []
+        for station in range(len(self)):
+            arrivals = arrival_counts[station]
+            departures = departure_counts[station]
+            results.append([station, arrivals, departures, loss_counts[station], float(area[station] / c.T),
+                            float(loss_counts[station] / arrivals) if arrivals else 0.0,
+                            float(sojourn_sum[station] / departures) if departures else 0.0,
+                            float(busy_area[station] / (self.servers[station] * c.T))])
+        return results
+
+    ##
+    # Returns: the total arrival rate at each station (external and routed), ignoring losses
+    #
+    def station_arrival_rates(self):
+        return theory.jackson_arrival_rates(self.arrival_rates, self.routing)
+
+
+##
+# Returns: the routing matrix of n stations in tandem (each station feeds the next; the last one's packets leave)
+#
+def tandem_routing(n):
+    return np.eye(n, k=1)
+
+
+##
+# Returns: the routing matrix of a random feed-forward network of n stations, where each station sends its packets to
+# up to fanout later stations (or out of the network) with random probabilities
+# Parameters: n -> the number of stations
+#             fanout -> the largest number of next stations
+#             exit_probability -> the probability that a packet leaves the network at each station (always 1 at the
+#                                 last station)
+#             seed -> seed of the random layout
+#
+def feed_forward_routing(n, fanout=2, exit_probability=0.2, seed=None):
+    rng = np.random.default_rng(seed)
+    routing = np.zeros((n, n))
+    for station in range(n - 1):
+        next_stations = rng.choice(np.arange(station + 1, n), size=min(fanout, n - station - 1), replace=False)
+        weights = rng.random(len(next_stations))
+        routing[station, next_stations] = (1 - exit_probability) * weights / weights.sum()
+    return routing
@@ -0,0 +1,91 @@
+import numpy as np
+
+
+class QueueStatistics:
+    def __init__(self):
+        # Counts for each event type and dropped packets
+        self.arrival_count = 0
+        self.departure_count = 0
+        self.observer_count = 0
+        self.loss_count = 0
+
+        # Sum of queue sizes recorded at observation events (observer estimate of E[N])
+        self.queue_size_sum = 0
+
+        # Time integral of the queue size (exact time-average E[N]) and total idle time
+        self.queue_size_area = 0.0
+        self.idle_time = 0.0
+
+        # Time up to which statistics have been accumulated
+        self.elapsed = 0.0
+
+        # Departure times of the packets still in the system at the end of the last window, and the departure time
+        # of the last accepted packet
+        self.in_system = np.empty(0)
+        self.prev_departure = 0.0
+
+    ##
+    # Accumulates the statistics over the window [elapsed, window_end) directly from sorted event time arrays
+    # Parameters: arrival_times -> sorted arrival times in the window
+    #             accepted -> boolean mask of the arrivals that entered the buffer (None if none were dropped)
+    #             departure_times -> departure times of the accepted arrivals, in the same order
+    #             observer_times -> sorted observer times in the window
+    #             window_end -> end of the window
+    # Returns: none
+    #
+    def add_window(self, arrival_times, accepted, departure_times, observer_times, window_end):
+        window_start = self.elapsed
+        accepted_times = arrival_times if accepted is None else arrival_times[accepted]
+        departures = np.concatenate((self.in_system, departure_times))
+        carried = len(self.in_system)
+
+        # Queue size at each observer time = packets carried in + arrivals so far - departures so far
+        queue_sizes = carried + np.searchsorted(accepted_times, observer_times, side='right') - \
+            np.searchsorted(departures, observer_times, side='right')
+        self.queue_size_sum += int(queue_sizes.sum())
+
+        # Each packet contributes the part of its time in the system that falls inside the window
+        clipped_departures = np.minimum(departures, window_end)
+        self.queue_size_area += float(clipped_departures[:carried].sum() - carried * window_start)
+        self.queue_size_area += float((clipped_departures[carried:] - accepted_times).sum())
+
+        # The server is idle between a departure and the next accepted arrival, and after the last departure
+        if len(departure_times) > 0:
+            prev_departures = np.concatenate(([self.prev_departure], departure_times[:-1]))
+            gaps = accepted_times - np.maximum(prev_departures, window_start)
+            self.idle_time += float(gaps[gaps > 0].sum())
+            self.prev_departure = float(departure_times[-1])
+        self.idle_time += max(window_end - max(self.prev_departure, window_start), 0)
+
+        # Update counts and carry the packets still in the system into the next window
+        finished = np.searchsorted(departures, window_end, side='right')
+        self.arrival_count += len(arrival_times)
+        self.loss_count += len(arrival_times) - len(accepted_times)
+        self.departure_count += int(finished)
+        self.observer_count += len(observer_times)
+        self.in_system = departures[finished:]
+        self.elapsed = window_end
+
+    ##
+    # Returns: the observer estimate of E[N]
+    #
+    def mean_queue_size(self):
+        return self.queue_size_sum * 1.0 / self.observer_count
+
+    ##
+    # Returns: the exact time-average of the queue size
+    #
+    def time_average_queue_size(self):
+        return self.queue_size_area / self.elapsed
+
+    ##
+    # Returns: the fraction of time the server is idle
+    #
+    def idle_fraction(self):
+        return self.idle_time / self.elapsed
+
+    ##
+    # Returns: the fraction of arrivals that were dropped
+    #
+    def loss_fraction(self):
+        return self.loss_count * 1.0 / self.arrival_count
@@ -0,0 +1,37 @@
+from heapq import heappop, heappush
+
+
+class Scheduler:
+    def __init__(self):
+        # Min-heap of (event_time, sequence, event_type) entries
+        # The sequence number breaks ties in scheduling order and keeps event types from being compared
+        self.heap = []
+        self.sequence = 0
+
+    ##
+    # Schedules an event
+    # Parameters: event_time -> the time of the event
+    #             event_type -> the EVENT_* type of the event
+    # Returns: none
+    #
+    def schedule(self, event_time, event_type):
+        heappush(self.heap, (event_time, self.sequence, event_type))
+        self.sequence += 1
+
+    ##
+    # Returns: whether there are scheduled events left to process
+    #
+    def has_next_event(self):
+        return len(self.heap) > 0
+
+    ##
+    # Removes and returns the earliest scheduled event
+    # Parameters: none
+    # Returns: (event_time, event_type) of the next event
+    #
+    def next_event(self):
+        event_time, _, event_type = heappop(self.heap)
+        return event_time, event_type
+
+    def __len__(self):
+        return len(self.heap)
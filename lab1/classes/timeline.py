@@ -0,0 +1,52 @@
+import numpy as np
+
+
+class Timeline:
+    def __init__(self):
+        # Parallel arrays of event times and EVENT_* type codes
+        self.times = np.empty(0, dtype=np.float64)
+        self.types = np.empty(0, dtype=np.uint8)
+
+        # Index of the next event to process
+        self.index = 0
+
+    ##
+    # Merges sorted event time arrays into the timeline
+    # The streams are concatenated and ordered with one stable argsort. This is a sort rather than a merge, but NumPy's
+    # stable sort of floats is timsort, which finds the sorted runs and merges them, so k streams cost O(n log k) (much
+    # less than sorting unordered times, and less than placing each stream with np.searchsorted). Ties keep the order
+    # in which the streams were given, with the events already in the timeline first.
+    # Parameters: streams -> (times, event_type) pairs, where times is a sorted array and event_type is an EVENT_* type
+    # Returns: none
+    #
+    def merge(self, *streams):
+        times = [self.times[self.index:]]
+        types = [self.types[self.index:]]
+        for stream_times, event_type in streams:
+            times.append(np.asarray(stream_times, dtype=np.float64))
+            types.append(np.full(len(stream_times), event_type, dtype=np.uint8))
+
+        times = np.concatenate(times)
+        order = np.argsort(times, kind='stable')
+        self.times = times[order]
+        self.types = np.concatenate(types)[order]
+        self.index = 0
+
+    ##
+    # Returns: whether there are events left to process
+    #
+    def has_next_event(self):
+        return self.index < len(self.times)
+
+    ##
+    # Returns the next event and advances the timeline
+    # Parameters: none
+    # Returns: (event_time, event_type) of the next event
+    #
+    def next_event(self):
+        i = self.index
+        self.index += 1
+        return self.times.item(i), self.types.item(i)
+
+    def __len__(self):
+        return len(self.times) - self.index
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+# Compare the memory footprint and dispatch speed of the slotted, int-typed events against the previous
+# dict-based events with string types, and the footprint of the typed-array timeline used by the vectorized mode.
+
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+from classes.events import ArrivalEvent, DepartureEvent, ObserverEvent
+from classes.timeline import Timeline
+from utils import constants as c
+
+n = 1000000
+
+
+# The previous event representation: a regular class with a per-instance __dict__ and a string event type
+class DictEvent:
+    def __init__(self, event_time, event_type):
+        self.event_time = event_time
+        self.event_type = event_type
+
+
+# Returns the bytes allocated per event when creating n events
+def bytes_per_event(create):
+    tracemalloc.start()
+    events = [create(float(i)) for i in range(n)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Exclude the list holding the events
+    return (size - events.__sizeof__()) / n, events
+
+
+# Returns the number of events dispatched per second by an if/elif chain on the event type (best of 3 passes)
+def events_per_second(events, arrival, departure):
+    best = 0
+    for _ in range(3):
+        counts = [0, 0, 0]
+        start = time.perf_counter()
+        for event in events:
+            if event.event_type == arrival:
+                counts[0] += event.event_time > 0
+            elif event.event_type == departure:
+                counts[1] += event.event_time > 0
+            else:
+                counts[2] += event.event_time > 0
+        best = max(best, n / (time.perf_counter() - start))
+    return best
+
+
+dict_classes = [lambda t: DictEvent(t, 'a'), lambda t: DictEvent(t, 'd'), lambda t: DictEvent(t, 'o')]
+slotted_classes = [ArrivalEvent, DepartureEvent, ObserverEvent]
+
+for name, classes, arrival, departure in [('dict', dict_classes, 'a', 'd'),
+                                          ('slots', slotted_classes, c.EVENT_ARRIVAL, c.EVENT_DEPARTURE)]:
+    size, events = bytes_per_event(lambda t: classes[int(t) % 3](t))
+    rate = events_per_second(events, arrival, departure)
+    print('{}: {:.1f} bytes/event, {:.0f} events/s'.format(name, size, rate))
+    del events
+    gc.collect()
+
+timeline = Timeline()
+timeline.merge((np.arange(n, dtype=np.float64), c.EVENT_ARRIVAL))
+print('timeline: {:.1f} bytes/event'.format((timeline.times.nbytes + timeline.types.nbytes) / n))
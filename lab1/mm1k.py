@@ -1,17 +1,68 @@
 #!/usr/bin/env python3
 
-# DES Simulator for an M/M/1 queue (i.e. infinite buffer)
+# DES Simulator for an M/M/1/K queue (i.e. finite buffer)
 
-from classes.event_queue import EventQueue
+import argparse
 
-file = 'mm1k.csv'
-headers = ['K', 'rho', 'E[N]', 'P_LOSS']
+from classes.event_queue import EventQueue, run_replicated_sweeps, run_sweeps, spawn_seeds
+from common.cache import ResultCache
+from common.checkpoint import ResultStore
+from common.sinks import open_sink
+from utils import constants as c
+from utils.sources import SOURCE_NAMES, parse_source
 
-print('Format: ' + ', '.join(headers))
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    modes = [c.MODE_EVENT, c.MODE_VECTORIZED, c.MODE_ANALYTIC, c.MODE_STREAM, c.MODE_SCHEDULER]
+    parser.add_argument('--mode', choices=modes, default=c.MODE_EVENT)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--servers', type=int, default=1, help='number of servers (M/M/c, scheduler mode only)')
+    parser.add_argument('--arrivals', type=parse_source, default=None,
+                        help='inter-arrival time source: {} (default exponential)'.format(', '.join(SOURCE_NAMES)))
+    parser.add_argument('--service', type=parse_source, default=None,
+                        help='packet length source, with the same choices (default exponential)')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes to run (K, rho) points in')
+    parser.add_argument('--replications', type=int, default=None,
+                        help='maximum number of independent replications per point (single run if not given)')
+    parser.add_argument('--target', type=float, default=0.05,
+                        help='stop replicating once every 95%% CI half-width is within this fraction of the mean')
+    parser.add_argument('--results-store', default=None,
+                        help='file to save finished points to; points already in it are skipped on a re-run')
+    parser.add_argument('--snapshot-dir', default=None, help='directory to save snapshots of running points to')
+    parser.add_argument('--snapshot-interval', type=float, default=100,
+                        help='simulated seconds between snapshots of a running point')
+    parser.add_argument('--cache-dir', default=None, help='directory to cache the results of seeded points in')
+    parser.add_argument('--cache-size', type=float, default=64, help='size limit of the cache in MB')
+    parser.add_argument('--output', default='mm1k.csv', help='file to write the results to (.csv or .npy)')
+    args = parser.parse_args()
+    if args.servers > 1 and args.mode != c.MODE_SCHEDULER:
+        parser.error('--servers requires --mode scheduler')
 
-data = []
-for K in [10, 25, 50]:
-    mm1k_des = EventQueue(0.5, 1.5, 0.1, K)
-    data += mm1k_des.run_des()
+    headers = ['K', 'rho', 'E[N]', 'P_LOSS']
+    if args.mode in (c.MODE_ANALYTIC, c.MODE_STREAM):
+        headers.append('E[N] (time average)')
+    if args.replications:
+        metric_headers = headers[2:]
+        headers = headers[:2]
+        for header in metric_headers:
+            headers += [header, header + ' 95% CI half-width']
+        headers.append('Replications')
 
-write_to_csv(file, headers, data)
+    print('Format: ' + ', '.join(headers))
+
+    store = ResultStore(args.results_store) if args.results_store else None
+    cache = ResultCache(args.cache_dir, c, int(args.cache_size * 1024 * 1024)) if args.cache_dir else None
+
+    # All K values are swept in one pool, each from its own seed
+    K_values = [10, 25, 50]
+    mm1k_des = [EventQueue(0.5, 1.5, 0.1, K, mode=args.mode, seed=seed, servers=args.servers,
+                           snapshot_dir=args.snapshot_dir, snapshot_interval=args.snapshot_interval,
+                           cache=cache, arrivals=args.arrivals, service=args.service)
+                for K, seed in zip(K_values, spawn_seeds(args.seed, len(K_values)))]
+    # Rows are written to the output file as the points finish
+    with open_sink(args.output, headers) as sink:
+        if args.replications:
+            run_replicated_sweeps(mm1k_des, args.workers, store=store, sink=sink, max_replications=args.replications,
+                                  target=args.target)
+        else:
+            run_sweeps(mm1k_des, args.workers, store, sink)
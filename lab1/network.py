@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+# DES Simulator for networks of M/M/c(/K) stations: a tandem chain, or a random feed-forward network
+
+import argparse
+
+import numpy as np
+
+from classes.network_queue import NETWORK_HEADERS, NetworkQueue, feed_forward_routing, tandem_routing
+from common.sinks import open_sink
+from utils import constants as c, theory
+from utils.sources import SOURCE_NAMES, parse_source
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--topology', choices=['tandem', 'feedforward'], default='tandem')
+    parser.add_argument('--stations', type=int, default=10, help='number of stations')
+    parser.add_argument('--servers', type=int, default=1, help='number of servers at each station')
+    parser.add_argument('--K', type=int, default=None, help='number of packets each station can hold (infinite if '
+                                                            'not given)')
+    parser.add_argument('--rho', type=float, default=0.8, help='load per server at every station')
+    parser.add_argument('--mode', choices=[c.MODE_SCHEDULER, c.MODE_ANALYTIC], default=c.MODE_SCHEDULER)
+    parser.add_argument('--fanout', type=int, default=2,
+                        help='largest number of next stations of each station (feed-forward topology)')
+    parser.add_argument('--exit', type=float, default=0.2,
+                        help='probability that a packet leaves the network at each station (feed-forward topology)')
+    parser.add_argument('--arrivals', type=parse_source, default=None,
+                        help='inter-arrival time source: {} (default exponential)'.format(', '.join(SOURCE_NAMES)))
+    parser.add_argument('--service', type=parse_source, default=None,
+                        help='service time source, with the same choices (default exponential)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--T', type=float, default=c.T, help='simulation time')
+    parser.add_argument('--output', default='network.csv', help='file to write the results to (.csv or .npy)')
+    args = parser.parse_args()
+
+    c.T = args.T
+
+    # External packets arrive at the first station at the rate that loads it to rho with the M/M/1 service time L / C;
+    # every other station's service time is then set so that its total arrival rate loads it to rho as well
+    if args.topology == 'tandem':
+        routing = tandem_routing(args.stations)
+    else:
+        routing = feed_forward_routing(args.stations, args.fanout, args.exit, args.seed)
+    arrival_rates = np.zeros(args.stations)
+    arrival_rates[0] = args.rho * args.servers * c.C / c.L
+    station_rates = theory.jackson_arrival_rates(arrival_rates, routing)
+    service_times = np.where(station_rates > 0, args.rho * args.servers / np.maximum(station_rates, 1e-300), c.L / c.C)
+
+    network = NetworkQueue(arrival_rates, service_times, routing, args.servers, args.K, mode=args.mode,
+                           seed=args.seed, arrivals=args.arrivals, service=args.service)
+
+    # Open Jackson network theory applies to Poisson arrivals, exponential service and infinite buffers
+    exact = args.K is None and args.arrivals is None and args.service is None and args.rho < 1
+    headers = NETWORK_HEADERS + (['E[N] (theory)', 'E[T] (theory)'] if exact else [])
+    print('Format: ' + ', '.join(headers))
+
+    with open_sink(args.output, headers) as sink:
+        for row in network.run():
+            if exact:
+                station = row[0]
+                expected = theory.mmc_mean_queue_size(args.rho, args.servers) if station_rates[station] > 0 else 0.0
+                row += [expected, expected / station_rates[station] if station_rates[station] > 0 else 0.0]
+            print(', '.join(str(value) for value in row))
+            sink.write_row(row)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+# Profiles a single M/M/1 or M/M/1/K point: per-phase timings and counters, and optionally cProfile or a sampling
+# profiler over the whole run
+
+import argparse
+
+from classes.event_queue import EventQueue
+from common import profiling
+from common.sinks import open_sink
+from utils import constants as c
+from utils.sources import SOURCE_NAMES, parse_source
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    modes = [c.MODE_EVENT, c.MODE_VECTORIZED, c.MODE_ANALYTIC, c.MODE_STREAM, c.MODE_SCHEDULER]
+    parser.add_argument('--rho', type=float, default=0.95)
+    parser.add_argument('--K', type=int, default=None, help='queue size (M/M/1 if not given)')
+    parser.add_argument('--mode', choices=modes, default=c.MODE_EVENT)
+    parser.add_argument('--arrivals', type=parse_source, default=None,
+                        help='inter-arrival time source: {} (default exponential)'.format(', '.join(SOURCE_NAMES)))
+    parser.add_argument('--service', type=parse_source, default=None,
+                        help='packet length source, with the same choices (default exponential)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--T', type=float, default=100, help='simulation time')
+    parser.add_argument('--profiler', choices=['none', 'cprofile', 'sample'], default='none')
+    parser.add_argument('--interval', type=float, default=0.001, help='sampling interval in seconds')
+    parser.add_argument('--no-instrument', action='store_true', help='turn off the per-phase timers and counters')
+    parser.add_argument('--trace', default=None,
+                        help='file to write the queue size after every event to (.csv or .npy)')
+    args = parser.parse_args()
+
+    if args.trace and args.mode in (c.MODE_ANALYTIC, c.MODE_STREAM):
+        parser.error('--trace requires the event, vectorized or scheduler mode')
+
+    c.T = args.T
+    trace = open_sink(args.trace, ['rho', 'time', 'queue_size']) if args.trace else None
+    event_queue = EventQueue(args.rho, args.rho, 0.1, args.K, mode=args.mode, seed=args.seed,
+                             instrument=not args.no_instrument, trace=trace, arrivals=args.arrivals,
+                             service=args.service)
+
+    if args.profiler == 'cprofile':
+        profiling.run_cprofile(event_queue.run_des)
+    elif args.profiler == 'sample':
+        profiling.run_sampling_profile(event_queue.run_des, args.interval)
+    else:
+        event_queue.run_des()
+
+    if trace is not None:
+        trace.close()
+    event_queue.instrumentation.report()
@@ -4,6 +4,20 @@ L = 2000
 C = 1000000.0
 T = 1000
 
-EVENT_ARRIVAL = 'a'
-EVENT_DEPARTURE = 'd'
-EVENT_OBSERVER = 'o'
\ No newline at end of file
+# Event types are small ints so they are cheap to compare and fit in the timeline's uint8 type array
+EVENT_ARRIVAL = 0
+EVENT_DEPARTURE = 1
+EVENT_OBSERVER = 2
+
+# Event generation modes
+MODE_EVENT = 'event'            # One event object per exponential draw
+MODE_VECTORIZED = 'vectorized'  # Event times drawn in NumPy blocks and merged into a typed-array timeline
+MODE_ANALYTIC = 'analytic'      # Metrics computed directly from the event time arrays, without processing events
+MODE_STREAM = 'stream'          # Analytic metrics computed one time window at a time, with bounded memory
+MODE_SCHEDULER = 'scheduler'    # Events scheduled on a heap while the queue is simulated (supports M/M/c)
+
+# Number of exponential variates drawn per NumPy block
+BLOCK_SIZE = 65536
+
+# Length of the time windows generated and processed at once in stream mode
+STREAM_WINDOW = 10
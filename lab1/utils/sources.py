@@ -0,0 +1,197 @@
+# Sources of inter-arrival times and packet lengths
+# Every source is a scale family: draw(generator, mean, size) returns a block of size variates with the given mean, so
+# the same source serves every rho (and every rate or length) of a sweep. Blocks are drawn with NumPy, so
+# non-exponential workloads run through the same vectorized paths as exponential ones, and sources drawn one variate
+# at a time (event and scheduler modes) are served from pre-drawn blocks by RandomStream.sample.
+
+import os
+
+import numpy as np
+
+
+class Source:
+    ##
+    # Returns: a block of size variates with the given mean, drawn from the NumPy generator
+    #
+    def draw(self, generator, mean, size):
+        raise NotImplementedError
+
+    ##
+    # Returns: the squared coefficient of variation (variance / mean^2) of the distribution
+    #
+    def scv(self):
+        raise NotImplementedError
+
+    ##
+    # Resets the source at the start of a point (only trace sources have state to reset)
+    #
+    def start(self, generator):
+        pass
+
+    ##
+    # Returns: a description of the source, used in result and cache keys
+    #
+    def key(self):
+        raise NotImplementedError
+
+
+class ExponentialSource(Source):
+    def draw(self, generator, mean, size):
+        return generator.exponential(mean, size)
+
+    def scv(self):
+        return 1.0
+
+    def key(self):
+        return ['exponential']
+
+
+class DeterministicSource(Source):
+    def draw(self, generator, mean, size):
+        return np.full(size, float(mean))
+
+    def scv(self):
+        return 0.0
+
+    def key(self):
+        return ['deterministic']
+
+
+# Pareto (type I) distribution with the given shape, heavy-tailed for small shapes; the shape must be above 1 for the
+# mean to exist (and above 2 for the variance to)
+class ParetoSource(Source):
+    def __init__(self, shape=2.5):
+        if shape <= 1:
+            raise ValueError('The Pareto shape must be greater than 1, got {}'.format(shape))
+        self.shape = shape
+
+    def draw(self, generator, mean, size):
+        scale = mean * (self.shape - 1) / self.shape
+        return scale * (1 + generator.pareto(self.shape, size))
+
+    def scv(self):
+        return 1.0 / (self.shape * (self.shape - 2)) if self.shape > 2 else np.inf
+
+    def key(self):
+        return ['pareto', self.shape]
+
+
+# Two values (e.g. short acknowledgements and full-size packets), the larger drawn with probability p; only their ratio
+# matters, since they are scaled to the requested mean
+class BimodalSource(Source):
+    def __init__(self, small=64, large=1500, p=0.5):
+        if not 0 <= p <= 1 or small <= 0 or large <= 0:
+            raise ValueError('Invalid bimodal source: {}, {}, {}'.format(small, large, p))
+        self.small = small
+        self.large = large
+        self.p = p
+
+    def draw(self, generator, mean, size):
+        scale = mean / (self.small * (1 - self.p) + self.large * self.p)
+        return np.where(generator.random(size) < self.p, self.large * scale, self.small * scale)
+
+    def scv(self):
+        mean = self.small * (1 - self.p) + self.large * self.p
+        return self.p * (1 - self.p) * (self.large - self.small) ** 2 / mean ** 2
+
+    def key(self):
+        return ['bimodal', self.small, self.large, self.p]
+
+
+# Replays the gaps of a recorded trace, scaled to the requested mean, so its burstiness is kept at every load
+# The trace is memory-mapped and read a block at a time. It can be a .npy file holding either packet timestamps (a
+# plain array, or a 'timestamp' field) or inter-arrival times (an 'interarrival' field, as written by lab3's
+# analyze.py), or a raw binary file of float64 timestamps. Each point starts at a random gap drawn from its stream, so
+# independent replications replay different parts of the trace, and the trace wraps around at its end.
+class TraceSource(Source):
+    def __init__(self, path):
+        self.path = path
+        self.position = 0
+        self.values = None
+        self.timestamps = True
+        self.count = 0
+        self.open()
+
+        if self.count < 1:
+            raise ValueError('The trace {} has no inter-arrival times'.format(path))
+        if self.timestamps:
+            self.mean = (float(self.values[-1]) - float(self.values[0])) / self.count
+        else:
+            self.mean = float(np.mean(self.values))
+        if not self.mean > 0:
+            raise ValueError('The trace {} has a mean inter-arrival time of {}'.format(path, self.mean))
+
+    ##
+    # Maps the trace file
+    #
+    def open(self):
+        if os.path.splitext(self.path)[1] == '.npy':
+            values = np.load(self.path, mmap_mode='r')
+        else:
+            values = np.memmap(self.path, dtype=np.float64, mode='r')
+        self.timestamps = values.dtype.names is None or 'interarrival' not in values.dtype.names
+        if values.dtype.names is not None:
+            values = values['timestamp' if self.timestamps else 'interarrival']
+        self.values = values
+        self.count = len(values) - 1 if self.timestamps else len(values)
+
+    ##
+    # Returns: the gaps start to stop of the trace
+    #
+    def gaps(self, start, stop):
+        if self.timestamps:
+            return np.diff(self.values[start:stop + 1])
+        return np.asarray(self.values[start:stop], dtype=np.float64)
+
+    def draw(self, generator, mean, size):
+        blocks = []
+        remaining = size
+        while remaining > 0:
+            stop = min(self.position + remaining, self.count)
+            blocks.append(self.gaps(self.position, stop))
+            remaining -= stop - self.position
+            self.position = stop % self.count
+        return np.concatenate(blocks) * (mean / self.mean) if blocks else np.empty(0)
+
+    def scv(self):
+        variance = 0.0
+        for start in range(0, self.count, 1 << 20):
+            gaps = self.gaps(start, min(start + (1 << 20), self.count))
+            variance += float(np.sum((gaps - self.mean) ** 2))
+        return variance / self.count / self.mean ** 2
+
+    def start(self, generator):
+        self.position = int(generator.integers(self.count))
+
+    def key(self):
+        status = os.stat(self.path)
+        return ['trace', os.path.abspath(self.path), status.st_size, status.st_mtime]
+
+    # The mapping is not pickled (it would be copied in full); it is opened again when the source is unpickled
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['values'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.open()
+
+
+EXPONENTIAL = ExponentialSource()
+
+SOURCE_NAMES = ['exponential', 'deterministic', 'pareto[:SHAPE]', 'bimodal[:SMALL:LARGE[:P]]', 'trace:PATH']
+
+
+# Returns the source described by a command line spec (one of SOURCE_NAMES), e.g. 'pareto:1.8' or
+# 'bimodal:64:1500:0.4'
+def parse_source(spec):
+    name, _, arguments = spec.partition(':')
+    if name == 'trace':
+        return TraceSource(arguments)
+    values = [float(value) for value in arguments.split(':')] if arguments else []
+    sources = {'exponential': ExponentialSource, 'deterministic': DeterministicSource, 'pareto': ParetoSource,
+               'bimodal': BimodalSource}
+    if name not in sources:
+        raise ValueError('Unknown source {!r}; expected one of {}'.format(spec, ', '.join(SOURCE_NAMES)))
+    return sources[name](*values)
@@ -0,0 +1,65 @@
+# Closed-form results for the M/M/1, M/G/1, M/M/c and M/M/1/K queues and open Jackson networks, used to validate the
+# simulators
+# rho is the traffic intensity (lambda / mu, per server for M/M/c) and K the number of packets the system can hold
+
+import numpy as np
+
+
+# Returns the mean number of packets in an M/M/1 queue (rho < 1)
+def mm1_mean_queue_size(rho):
+    return rho / (1 - rho)
+
+
+# Returns the fraction of time an M/M/1 server is idle (rho < 1)
+def mm1_idle_probability(rho):
+    return 1 - rho
+
+
+# Returns the mean number of packets in an M/G/1 queue (rho < 1) whose service times have the given squared coefficient
+# of variation (the Pollaczek-Khinchine formula); scv = 1 gives M/M/1 and scv = 0 gives M/D/1
+def mg1_mean_queue_size(rho, scv):
+    return rho + rho ** 2 * (1 + scv) / (2 * (1 - rho))
+
+
+# Returns the probability that an arriving packet has to wait in an M/M/c queue (the Erlang C formula, rho < 1)
+def erlang_c(rho, servers):
+    # Terms load^n / n! are built up one at a time, so large pools do not overflow
+    load = rho * servers
+    term = 1.0
+    total = 0.0
+    for n in range(servers):
+        total += term
+        term *= load / (n + 1)
+    waiting = term / (1 - rho)
+    return waiting / (total + waiting)
+
+
+# Returns the mean number of packets in an M/M/c queue (rho < 1)
+def mmc_mean_queue_size(rho, servers):
+    return servers * rho + erlang_c(rho, servers) * rho / (1 - rho)
+
+
+# Returns the total arrival rate at each station of an open Jackson network, solving the traffic equations
+# lambda = gamma + P^T lambda for the external arrival rates gamma and routing matrix P (P[i][j] is the probability
+# that a packet leaving station i goes to station j)
+def jackson_arrival_rates(external_rates, routing):
+    routing = np.asarray(routing, dtype=np.float64)
+    return np.linalg.solve(np.eye(len(routing)) - routing.T, np.asarray(external_rates, dtype=np.float64))
+
+
+# Returns the probabilities of each number of packets (0 to K) in an M/M/1/K queue
+def mm1k_state_probabilities(rho, K):
+    weights = [rho ** n for n in range(K + 1)]
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+
+# Returns the mean number of packets in an M/M/1/K queue
+def mm1k_mean_queue_size(rho, K):
+    return sum(n * p for n, p in enumerate(mm1k_state_probabilities(rho, K)))
+
+
+# Returns the probability that an arriving packet is dropped by an M/M/1/K queue (the probability that it finds the
+# queue full, since Poisson arrivals see time averages)
+def mm1k_loss_probability(rho, K):
+    return mm1k_state_probabilities(rho, K)[K]
@@ -1,21 +1,91 @@
 # Util functions for Lab 1
 
-import csv
 import math
-from random import random
+from heapq import heappop, heappush, heapreplace
 
+import numpy as np
 
-# Returns an exponential random variable
-def get_random_variable(mean):
-    return -mean*math.log(1-random())
+from . import constants as c, sources
 
 
-# Writes the results to the corresponding CSV file.
-def write_to_csv(file, headers, data):
-    with open(file, mode='w', newline='') as output_file:
-        output_writer = csv.writer(output_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-        output_writer.writerow(headers)
-        for result in data:
-            output_writer.writerow(result)
+# Returns a random variable with the given mean drawn from the given RandomStream: exponential, or from the source's
+# distribution if one is given (see utils.sources)
+def get_random_variable(mean, stream, source=None):
+    if source is None:
+        return stream.exponential(mean)
+    return stream.sample(source, mean)
 
-    print('Results written to {}'.format(file))
\ No newline at end of file
+
+# Returns a sorted array of event times in [0, T), with exponential inter-event times unless another source is given.
+# Inter-event times are drawn in blocks and cumulatively summed until T is passed.
+def generate_event_times(rng, mean, T, block_size=c.BLOCK_SIZE, source=sources.EXPONENTIAL):
+    blocks = []
+    curr_time = 0.0
+
+    # Size the first block so that it usually covers the whole horizon
+    size = max(int(T / mean * 1.05) + 1, 1)
+    while curr_time < T:
+        times = curr_time + np.cumsum(source.draw(rng, mean, size))
+        blocks.append(times)
+        curr_time = times[-1]
+        size = block_size
+
+    times = np.concatenate(blocks)
+    return times[:np.searchsorted(times, T)]
+
+
+# Generates the same event times as generate_event_times, one time window at a time.
+# Yields (window_end, times) for consecutive windows covering [0, T); events past the current window are kept for the
+# next one, so only about one window of events is in memory at once.
+def generate_event_time_windows(rng, mean, T, window, block_size=c.BLOCK_SIZE, source=sources.EXPONENTIAL):
+    pending = np.empty(0)
+    curr_time = 0.0
+    size = min(max(int(window / mean * 1.05) + 1, 1), block_size)
+
+    window_count = int(math.ceil(T / window))
+    for i in range(window_count):
+        window_end = min((i + 1) * window, T)
+        while curr_time < window_end:
+            times = curr_time + np.cumsum(source.draw(rng, mean, size))
+            pending = np.concatenate((pending, times))
+            curr_time = times[-1]
+
+        split = np.searchsorted(pending, window_end)
+        yield window_end, pending[:split]
+        pending = pending[split:]
+
+
+# Computes FIFO single-server departure times with Lindley's recursion, D_n = max(A_n, D_n-1) + S_n.
+# Unrolling the recursion gives D_n = P_n + max(D_-1, max_k<=n (A_k - P_k-1)), where P is the cumulative service
+# time and D_-1 is the departure before the first arrival, so the whole array is computed with a cumsum and a
+# running maximum.
+def lindley_departures(arrival_times, service_times, prev_departure=0):
+    cumulative_service = np.cumsum(service_times)
+    start_offsets = np.maximum.accumulate(arrival_times - (cumulative_service - service_times))
+    np.maximum(start_offsets, prev_departure, out=start_offsets)
+    return cumulative_service + start_offsets
+
+
+# Computes FIFO departure times for a pool of servers sharing one queue (Kiefer-Wolfowitz recursion): each packet
+# starts on the server that frees up first, no earlier than its arrival. With a capacity, a packet is dropped if that
+# many accepted packets are still in the system when it arrives.
+# Returns (departure times, accepted mask), with a departure time for every arrival (nan for dropped packets)
+def fifo_departures(arrival_times, service_times, servers, capacity=None):
+    if servers == 1 and capacity is None:
+        return lindley_departures(arrival_times, service_times), np.ones(len(arrival_times), dtype=bool)
+
+    free_times = [0.0] * servers
+    in_system = []
+    departure_times = np.full(len(arrival_times), np.nan)
+    for i, (arrival_time, service_time) in enumerate(zip(arrival_times.tolist(), service_times.tolist())):
+        if capacity is not None:
+            while len(in_system) > 0 and in_system[0] <= arrival_time:
+                heappop(in_system)
+            if len(in_system) >= capacity:
+                continue
+        departure_time = max(arrival_time, free_times[0]) + service_time
+        heapreplace(free_times, departure_time)
+        if capacity is not None:
+            heappush(in_system, departure_time)
+        departure_times[i] = departure_time
+    return departure_times, ~np.isnan(departure_times)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+# Validates the simulator against M/M/1 (or M/G/1) and M/M/1/K theory: runs independent replications of every
+# (K, rho) point and checks that each metric's confidence interval agrees with the closed-form value, then checks the
+# mean and variance of a bulk sample of exponential variates
+
+import argparse
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from classes.event_queue import EventQueue, spawn_seeds
+from common.replications import run_replications
+from common.rng import RandomStreams
+from common.sinks import open_sink
+from utils import constants as c, sources, theory
+
+MODES = [c.MODE_EVENT, c.MODE_VECTORIZED, c.MODE_ANALYTIC, c.MODE_STREAM, c.MODE_SCHEDULER]
+
+# Columns of the --output file; the metric name is a string field in .npy output
+HEADERS = ['K', 'rho', 'metric', 'mean', 'half_width', 'expected', 'passed']
+DTYPES = [np.int64, np.float64, 'U32', np.float64, np.float64, np.float64, np.int64]
+
+
+# Returns the closed-form value of each metric the EventQueue reports for a point, in the same order
+def expected_metrics(event_queue, rho):
+    K = event_queue.max_queue_size
+    if K:
+        expected = [theory.mm1k_mean_queue_size(rho, K), theory.mm1k_loss_probability(rho, K)]
+    else:
+        expected = [theory.mg1_mean_queue_size(rho, event_queue.service_source.scv()), theory.mm1_idle_probability(rho)]
+    if event_queue.mode in (c.MODE_ANALYTIC, c.MODE_STREAM):
+        expected.append(expected[0])
+    return expected
+
+
+# Returns the names of the metrics the EventQueue reports
+def metric_names(event_queue):
+    names = ['E[N]', 'P_LOSS' if event_queue.max_queue_size else 'P_IDLE']
+    if event_queue.mode in (c.MODE_ANALYTIC, c.MODE_STREAM):
+        names.append('E[N] (time average)')
+    return names
+
+
+# Returns whether a simulated mean agrees with the expected value: within bound confidence interval half-widths, plus
+# an absolute tolerance for metrics that are (close to) zero
+def agrees(mean, half_width, expected, bound, tolerance):
+    return abs(mean - expected) <= bound * half_width + tolerance
+
+
+# Checks the sample mean and variance of n exponential variates with the given mean against their expected values,
+# using the standard errors of the sample mean (mean / sqrt(n)) and sample variance (sqrt(8 / n) * mean^2)
+# Returns a list of (name, sample value, expected value, deviation in standard errors)
+def check_exponential(samples, mean):
+    n = len(samples)
+    sample_mean = float(np.mean(samples))
+    sample_variance = float(np.var(samples))
+    return [('mean', sample_mean, mean, abs(sample_mean - mean) / (mean / math.sqrt(n))),
+            ('variance', sample_variance, mean ** 2,
+             abs(sample_variance - mean ** 2) / (math.sqrt(8.0 / n) * mean ** 2))]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=MODES, default=c.MODE_ANALYTIC)
+    parser.add_argument('--T', type=float, default=200, help='simulation time of each replication')
+    parser.add_argument('--replications', type=int, default=15, help='number of replications per point')
+    parser.add_argument('--K', type=int, nargs='+', default=[10, 25, 50], help='queue sizes for M/M/1/K')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--service', type=sources.parse_source, default=sources.EXPONENTIAL,
+                        help='packet length source ({}); with any but exponential, only the M/G/1 sweep is checked '
+                             'against the Pollaczek-Khinchine formula'.format(', '.join(sources.SOURCE_NAMES)))
+    parser.add_argument('--workers', type=int, default=None, help='number of processes to run replications in')
+    parser.add_argument('--bound', type=float, default=2.0,
+                        help='number of 95%% CI half-widths a mean may be from the theoretical value')
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help='absolute difference always accepted (for metrics close to zero)')
+    parser.add_argument('--samples', type=int, default=1000000,
+                        help='number of exponential variates to check (half drawn in bulk, half one at a time)')
+    parser.add_argument('--output', default=None, help='file to write every check to (.csv or .npy)')
+    args = parser.parse_args()
+
+    c.T = args.T
+
+    # The M/M/1 (or M/G/1) sweep and each M/M/1/K sweep get their own seed
+    seeds = spawn_seeds(args.seed, len(args.K) + 1)
+    event_queues = [EventQueue(0.25, 0.95, 0.1, mode=args.mode, seed=seeds[0], service=args.service)]
+    if isinstance(args.service, sources.ExponentialSource):
+        event_queues += [EventQueue(0.5, 1.5, 0.1, K, mode=args.mode, seed=seed)
+                         for K, seed in zip(args.K, seeds[1:])]
+
+    sink = open_sink(args.output, HEADERS, DTYPES) if args.output else None
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers and args.workers > 1 else None
+    failures = 0
+    checks = 0
+
+    print('{:>4} {:>5}  {:<20} {:>12} {:>12} {:>12}'.format('K', 'rho', 'metric', 'mean', '95% CI', 'expected'))
+    try:
+        for event_queue in event_queues:
+            for rho, seed_sequence in event_queue.sweep_points():
+                rho = round(float(rho), 2)
+                run = partial(event_queue.run_replication, rho)
+                means, half_widths, _ = run_replications(run, seed_sequence, min_replications=args.replications,
+                                                         max_replications=args.replications, executor=executor,
+                                                         batch_size=args.workers or 1)
+
+                K = event_queue.max_queue_size or 0
+                for name, mean, half_width, expected in zip(metric_names(event_queue), means, half_widths,
+                                                            expected_metrics(event_queue, rho)):
+                    passed = agrees(mean, half_width, expected, args.bound, args.tolerance)
+                    checks += 1
+                    failures += not passed
+                    print('{:>4} {:>5.2f}  {:<20} {:>12.6g} {:>12.4g} {:>12.6g}  {}'.format(
+                        K or '-', rho, name, mean, half_width, expected, 'ok' if passed else 'FAIL'))
+                    if sink is not None:
+                        sink.write_row([K, rho, name, mean, half_width, expected, int(passed)])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if sink is not None:
+            sink.close()
+
+    # Exponential variates drawn in bulk (vectorized modes) and one at a time (event and scheduler modes), with the
+    # mean of random1000.py
+    mean = 1.0 / 75
+    stream = RandomStreams(args.seed).arrivals
+    bulk = stream.generator.exponential(mean, args.samples // 2)
+    single = np.array([stream.exponential(mean) for _ in range(args.samples // 2)])
+    for source, samples in [('bulk', bulk), ('single', single)]:
+        for name, value, expected, deviation in check_exponential(samples, mean):
+            passed = deviation <= 4
+            checks += 1
+            failures += not passed
+            print('exponential ({}) {}: {:.6g}, expected {:.6g} ({:.2f} standard errors)  {}'.format(
+                source, name, value, expected, deviation, 'ok' if passed else 'FAIL'))
+
+    print('{} of {} checks failed'.format(failures, checks))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+# Benchmarks LAN_DES on standard CSMA/CD workloads
+
+import argparse
+import json
+import sys
+
+from classes.lan_des import LAN_DES
+from common import benchmark
+from utils import constants as c
+
+# Standard workloads: name -> (N, A)
+WORKLOADS = {
+    'N20-A7': (20, 7),
+    'N20-A20': (20, 20),
+    'N100-A7': (100, 7),
+    'N100-A20': (100, 20),
+    'N2000-A0.1': (2000, 0.1)
+}
+
+MODES = [c.MODE_PERSISTENT, c.MODE_NON_PERSISTENT]
+
+
+# Runs a single workload and returns the number of frames put on the bus
+def run_workload(workload, mode, T, seed, vectorized):
+    N, A = WORKLOADS[workload]
+    lan_des = LAN_DES(N, A, T, mode == c.MODE_NON_PERSISTENT, seed=seed, vectorized=vectorized, verbose=False)
+    lan_des.run_des()
+    return lan_des.frames
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--workloads', nargs='+', choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    parser.add_argument('--T', type=float, default=10, help='simulation time of each workload')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--vectorized', action='store_true', help='benchmark the vectorized LAN_DES mode')
+    parser.add_argument('--output', default='benchmark.json', help='file to save the results to')
+    parser.add_argument('--baseline', default=None, help='results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fraction by which wall time or peak RSS may exceed the baseline')
+    parser.add_argument('--workload', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: run one workload and print its measurements
+    if args.workload:
+        result = benchmark.measure(lambda: run_workload(args.workload, args.modes[0], args.T, args.seed,
+                                                        args.vectorized))
+        print(json.dumps(result))
+        sys.exit()
+
+    results = {}
+    for workload in args.workloads:
+        for mode in args.modes:
+            name = '{}/{}{}'.format(workload, mode, '/vectorized' if args.vectorized else '')
+            print('Running', name)
+            child_args = ['--workload', workload, '--modes', mode, '--T', str(args.T), '--seed', str(args.seed)]
+            if args.vectorized:
+                child_args.append('--vectorized')
+            results[name] = benchmark.run_in_subprocess(__file__, child_args)
+
+    benchmark.print_results(results)
+    benchmark.save_results(results, args.output)
+
+    if args.baseline:
+        regressions = benchmark.find_regressions(results, benchmark.load_results(args.baseline), args.tolerance)
+        for regression in regressions:
+            print('Regression:', regression)
+        sys.exit(1 if regressions else 0)
@@ -1,3 +0,0 @@
-class ArrivalEvent:
-    def __init__(self, event_time):
-        self.event_time = event_time
@@ -0,0 +1,84 @@
+import hashlib
+from functools import partial
+
+import numpy as np
+
+from utils import constants as c
+
+
+class BusTopology:
+    # Stations placed anywhere along a bus made of segments joined by repeaters
+    # positions are the distances of the stations from the start of the bus (in metres, in any order) and repeaters
+    # the distances of the repeaters, each of which joins two segments and delays every signal crossing it by
+    # repeater_delay seconds
+    def __init__(self, positions, repeaters=(), repeater_delay=c.t_repeater):
+        self.positions = np.asarray(positions, dtype=np.float64)
+        self.repeaters = np.sort(np.asarray(repeaters, dtype=np.float64))
+        self.repeater_delay = repeater_delay
+        if self.positions.ndim != 1 or len(self.positions) < 1:
+            raise ValueError('A bus needs at least one station')
+
+        # Segment of each station: the number of repeaters between it and the start of the bus
+        self.segments = np.searchsorted(self.repeaters, self.positions, side='right')
+
+        # Distance of each station along the bus in units of c.t_prop (the propagation delay over c.D metres), with
+        # each repeater counted as the distance a signal covers in repeater_delay, so the delay between two stations
+        # is abs(coordinates[i] - coordinates[j]) * c.t_prop; stations c.D apart on one segment get the integer
+        # coordinates 0, 1, 2, ... and the exact delays abs(i - j) * c.t_prop of the equally spaced bus
+        self.coordinates = self.positions / c.D + self.segments * (repeater_delay / c.t_prop)
+
+        # Coordinates of the two ends of the bus, which bound how far any signal travels
+        self.coordinate_list = self.coordinates.tolist()
+        self.first = min(self.coordinate_list)
+        self.last = max(self.coordinate_list)
+
+    def __len__(self):
+        return len(self.positions)
+
+    # Returns N stations c.D metres apart, split into equal segments (the default bus of LAN_DES is one segment)
+    @classmethod
+    def uniform(cls, N, segments=1, spacing=c.D, repeater_delay=c.t_repeater):
+        positions = np.arange(N) * float(spacing)
+        # Each repeater sits halfway between the last station of a segment and the first station of the next
+        repeaters = [(np.ceil(N * k / segments) - 0.5) * spacing for k in range(1, segments)]
+        return cls(positions, repeaters, repeater_delay)
+
+    # Returns N stations at uniformly random positions along a bus of the given length (in metres), split into equal
+    # segments
+    @classmethod
+    def random(cls, N, length, segments=1, seed=None, repeater_delay=c.t_repeater):
+        positions = np.random.default_rng(seed).uniform(0, length, N)
+        repeaters = [length * k / segments for k in range(1, segments)]
+        return cls(positions, repeaters, repeater_delay)
+
+    # Returns the propagation delay from the sender to every station
+    def delays(self, sender):
+        return np.abs(self.coordinates - self.coordinates[sender]) * c.t_prop
+
+    # Returns the propagation delay from the sender to the station farthest from it
+    def max_delay(self, sender):
+        coordinate = self.coordinate_list[sender]
+        return max(coordinate - self.first, self.last - coordinate) * c.t_prop
+
+    # Returns a description of the topology, used in result and cache keys
+    def key(self):
+        digest = hashlib.sha256(self.positions.tobytes() + self.repeaters.tobytes()).hexdigest()
+        return ['bus', len(self), len(self.repeaters), self.repeater_delay, digest]
+
+
+TOPOLOGY_NAMES = ['uniform[:SEGMENTS[:SPACING]]', 'random:LENGTH[:SEGMENTS[:SEED]]']
+
+
+# Returns a function building the topology described by a command line spec (one of TOPOLOGY_NAMES) for N stations,
+# e.g. 'uniform:4' (four segments of equally spaced stations) or 'random:2500:5:1' (stations at random positions of a
+# 2500 m bus of five segments, placed with seed 1)
+def parse_topology(spec):
+    name, _, arguments = spec.partition(':')
+    values = [float(value) for value in arguments.split(':')] if arguments else []
+    if name == 'uniform' and len(values) <= 2:
+        return partial(BusTopology.uniform, segments=int(values[0]) if values else 1,
+                       spacing=values[1] if len(values) > 1 else c.D)
+    if name == 'random' and 1 <= len(values) <= 3:
+        return partial(BusTopology.random, length=values[0], segments=int(values[1]) if len(values) > 1 else 1,
+                       seed=int(values[2]) if len(values) > 2 else None)
+    raise ValueError('Unknown topology {!r}; expected one of {}'.format(spec, ', '.join(TOPOLOGY_NAMES)))
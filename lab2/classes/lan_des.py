@@ -1,64 +1,135 @@
-from classes.arrival_event import ArrivalEvent
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from heapq import heapify, heappop, heappush
+from time import perf_counter
+
+import numpy as np
+
+from classes.bus_topology import BusTopology
 from classes.lan_node import LanNode
+from common import checkpoint
+from common.profiling import Instrumentation, NullInstrumentation
+from common.replications import run_replications
+from common.rng import RandomStreams
 from utils import constants as c, utils
 
+# Attributes holding the state of a running simulation (saved in snapshots)
+SNAPSHOT_STATE = ['lan', 'wakeups', 'next_times', 'head_times', 'collision_counts', 'busy_counts', 'timer',
+                  'dropped_packets', 'total_packets', 'frames', 'streams']
+
 
 class LAN_DES:
-    def __init__(self, N, A, T, non_persistent=False):
+    def __init__(self, N, A, T, non_persistent=False, seed=None, vectorized=False, verbose=True,
+                 instrument=False, snapshot_dir=None, snapshot_interval=None, cache=None, trace=None, topology=None,
+                 jamming=False):
         # DES Parameters
         self.N = N
         self.A = A
         self.T = T
         self.non_persistent = non_persistent
 
+        # Placement of the nodes on the bus (N nodes c.D apart on one segment unless a BusTopology is given)
+        if topology is not None and len(topology) != N:
+            raise ValueError('The topology has {} nodes, expected {}'.format(len(topology), N))
+        self.topology = topology if topology is not None else BusTopology.uniform(N)
+
+        # Whether colliding nodes stop transmitting once they detect the collision and send a jamming signal, instead
+        # of occupying the bus for a whole frame
+        self.jamming = jamming
+
+        # Random streams for per-node traffic and backoff, all derived from the seed (an int or a SeedSequence)
+        self.seed = seed
+        self.streams = RandomStreams(seed)
+
+        # Whether per-node state is kept in NumPy arrays and each frame is handled with array operations
+        self.vectorized = vectorized
+
+        # Whether the metrics are printed at the end of the run
+        self.verbose = verbose
+
         self.lan = []
+
+        # Min-heap of (next_event_time, node index) entries used to find the next sender
+        # Entries are not removed when a node's time changes; stale ones are skipped when they reach the top
+        self.wakeups = []
+
+        # Per-node state for the vectorized mode: next event time, time of the packet at the head of the queue (inf if
+        # the queue is empty), and collision and busy counts
+        self.next_times = None
+        self.head_times = None
+        self.collision_counts = None
+        self.busy_counts = None
+
         self.timer = 0
         self.dropped_packets = 0
         self.total_packets = 0
 
+        # Number of transmission attempts (frames put on the bus)
+        self.frames = 0
+
+        # Per-phase timers and counters; the per-frame timers in the hot loops are only read when instrument is set
+        self.instrument = instrument
+        self.instrumentation = Instrumentation() if instrument else NullInstrumentation()
+
+        # Directory to save a snapshot of the simulation to every snapshot_interval seconds of simulated time, so an
+        # interrupted run resumes from the last snapshot instead of starting over
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_interval = snapshot_interval
+
+        # Optional ResultCache of finished runs (only used with a seed, since unseeded runs never repeat)
+        self.cache = cache
+
+        # Optional sink that a (time, sender, collisions) row is written to for every frame; a frame with no
+        # collisions was transmitted successfully
+        self.trace = trace
+
+        # Key identifying this configuration and seed in snapshots and the cache
+        self.key = config_key(N, A, T, non_persistent, vectorized, seed, topology, jamming)
+
     # Populates each node with events based on a Poisson distribution
+    # Each node's arrival times are generated as one array from its own traffic stream, up to and including the first
+    # arrival past T
     def populate_lan(self):
         for i in range(self.N):
-            curr_time = 0
-            curr_node_events = []
-
-            while curr_time < self.T:
-                inter_arrival_time = utils.get_random_variable(1.0 / self.A)
-                curr_time += inter_arrival_time
-
-                curr_node_events.append(ArrivalEvent(curr_time))
+            traffic = self.streams.stream('traffic', i).generator
+            self.lan.append(LanNode(utils.generate_arrival_times(traffic, 1.0 / self.A, self.T), i))
 
-            self.lan.append(LanNode(curr_node_events))
+        self.wakeups = [(node.next_event_time, node.index) for node in self.lan]
+        heapify(self.wakeups)
 
-    # Determines which node is the next sender
+    # Determines which node is the next sender (the lowest index among nodes with the earliest event time before T)
     def next_sender(self):
-        sender_index = -1
-        next_packet_time = self.T
+        while len(self.wakeups) > 0:
+            next_packet_time, sender_index = self.wakeups[0]
+            if next_packet_time == self.lan[sender_index].next_event_time:
+                return sender_index if next_packet_time < self.T else -1
+            heappop(self.wakeups)
 
-        for i in range(self.N):
-            if self.lan[i].next_event_time < next_packet_time:
-                next_packet_time = self.lan[i].next_event_time
-                sender_index = i
+        return -1
 
-        return sender_index
+    # Sets the virtual event time of a node and queues it for sender selection
+    def set_next_event_time(self, node, next_event_time):
+        node.next_event_time = next_event_time
+        heappush(self.wakeups, (next_event_time, node.index))
 
     # Update the event times based on the waiting period
     # In non-persistent, remove event if wait occurrences is above threshold
     def update_node_event_times(self, node, new_time, collision_logic=False):
         if not collision_logic and self.non_persistent:
             node.busy_count += 1
-            backoff_time = utils.get_exponential_backoff(node.busy_count)
+            backoff_time = utils.get_exponential_backoff(node.busy_count, self.streams.backoff)
 
             if node.busy_count > c.K_max:
                 node.busy_count = 0
-                node.events.popleft()
+                node.pop()
                 self.dropped_packets += 1
                 self.total_packets += 1
                 return
         else:
             backoff_time = 0
 
-        node.next_event_time = max(new_time + backoff_time, node.events[0].event_time)
+        self.set_next_event_time(node, max(new_time + backoff_time, node.head_time()))
 
     # Updates collision counter and event times for a collided node
     def handle_collision(self, node, waiting_start):
@@ -67,90 +138,524 @@ class LAN_DES:
 
         if node.collisions > c.K_max:
             node.collisions = 0
-            node.events.popleft()
+            node.pop()
             self.dropped_packets += 1
-            if len(node.events) > 0 and node.events[0].event_time > node.next_event_time:
-                node.next_event_time = node.events[0].event_time
+            if node.queue_length() > 0 and node.head_time() > node.next_event_time:
+                self.set_next_event_time(node, node.head_time())
             return
 
-        backoff_time = utils.get_exponential_backoff(node.collisions)
+        backoff_time = utils.get_exponential_backoff(node.collisions, self.streams.backoff)
 
         self.update_node_event_times(node, waiting_start + backoff_time, collision_logic=True)
 
-    # Main method which runs the simulation
-    def run_des(self):
-        self.populate_lan()
+    # Returns the indices of the nodes with packets whose next event time is at most until, in index order
+    # The wake-up heap is searched from its root, skipping every entry later than until along with its subtree (no
+    # entry is earlier than its parent), and stale entries are left out, so the cost grows with the number of nodes
+    # waking up before until rather than with N
+    def waking_nodes(self, until):
+        heap = self.wakeups
+        lan = self.lan
+        size = len(heap)
+        nodes = set()
+        stack = [0] if size > 0 else []
+        while stack:
+            k = stack.pop()
+            next_event_time, index = heap[k]
+            if next_event_time > until:
+                continue
+            node = lan[index]
+            if next_event_time == node.next_event_time and node.queue_length() > 0:
+                nodes.add(index)
+            k = 2 * k + 1
+            if k < size:
+                stack.append(k)
+                if k + 1 < size:
+                    stack.append(k + 1)
+        return sorted(nodes)
 
-        collision_occurred = False
-        successfully_transmitted = 0
-        total_collisions = 0
+    # Runs the frame-by-frame simulation over the LanNode objects, starting from the given counts (non-zero when
+    # resuming from a snapshot)
+    # Only the nodes waking up before the sender's signal (and jamming signal) has passed every node can collide or
+    # sense the bus as busy, so each frame only visits those nodes, found in the wake-up heap
+    # Returns (successfully transmitted packets, total collisions)
+    def simulate(self, successfully_transmitted=0, total_collisions=0):
+        instrument = self.instrument
+        trace = self.trace
+        next_snapshot = self.next_snapshot_time()
+        coordinates = self.topology.coordinate_list
+        jamming_time = c.jamming_time if self.jamming else 0
 
         while self.timer < self.T:
+            if instrument:
+                selection_start = perf_counter()
             sender = self.next_sender()
+            if instrument:
+                frame_start = perf_counter()
+                self.instrumentation.add_time('sender selection', frame_start - selection_start)
             if sender < 0:
                 break
-            self.timer = self.lan[sender].next_event_time
-            self.lan[sender].busy_count = 0
+            sender_node = self.lan[sender]
+            self.timer = sender_node.next_event_time
+            sender_node.busy_count = 0
+            coordinate = coordinates[sender]
 
+            nodes = self.waking_nodes(self.timer + self.topology.max_delay(sender) + c.t_trans + jamming_time)
             curr_collisions = 0
-            collided = []
+            collided = set()
+
+            # Time at which the sender first hears a colliding node's signal
+            detection_time = np.inf
 
-            for i in range(self.N):
-                if i == sender or len(self.lan[i].events) == 0:
+            for i in nodes:
+                if i == sender:
                     continue
+                node = self.lan[i]
                 # Determine upper and lower bounds (when packet is transmitting)
-                t_first_bit = self.timer + abs(i - sender) * c.t_prop
+                delay = abs(coordinates[i] - coordinate) * c.t_prop
+                t_first_bit = self.timer + delay
                 t_last_bit = t_first_bit + c.t_trans
 
                 # Cannot detect line is busy, collision occurs
-                if self.lan[i].next_event_time < t_first_bit:
-                    collision_occurred = True
+                # With jamming, the node stops once the sender's first bit reaches it and sends a jamming signal
+                if node.next_event_time < t_first_bit:
                     curr_collisions += 1
-                    collided.append((i, self.lan[i].next_event_time))
-                    self.handle_collision(self.lan[i], t_last_bit)
+                    collided.add(i)
+                    if self.jamming:
+                        detection_time = min(detection_time, node.next_event_time + delay)
+                        self.handle_collision(node, t_first_bit + jamming_time)
+                    else:
+                        self.handle_collision(node, t_last_bit)
 
                     self.total_packets += 1
 
             # Handle collision on sender last (in case of multiple collisions)
-            if collision_occurred:
-                collision_occurred = False
+            if curr_collisions > 0:
                 curr_collisions += 1
-                self.handle_collision(self.lan[sender], self.timer + c.t_trans)
-                    
+                if not self.jamming:
+                    self.handle_collision(sender_node, self.timer + c.t_trans)
+                else:
+                    # The sender stops once it hears the first colliding node and jams the bus, which other nodes
+                    # sense as busy until the jamming signal has passed them
+                    sender_end = min(detection_time, self.timer + c.t_trans) + jamming_time
+                    self.handle_collision(sender_node, sender_end)
+                    for i in nodes:
+                        if i == sender or i in collided:
+                            continue
+                        node = self.lan[i]
+                        delay = abs(coordinates[i] - coordinate) * c.t_prop
+                        if self.timer + delay <= node.next_event_time <= sender_end + delay:
+                            self.update_node_event_times(node, sender_end + delay)
+
             else:
-                for i in range(self.N):
-                    t_first_bit = self.timer + abs(i - sender) * c.t_prop
+                for i in nodes:
+                    node = self.lan[i]
+                    t_first_bit = self.timer + abs(coordinates[i] - coordinate) * c.t_prop
                     t_last_bit = t_first_bit + c.t_trans
 
                     # If line is busy, node will wait to transmit
-                    if t_first_bit <= self.lan[i].next_event_time <= t_last_bit:
-                        self.update_node_event_times(self.lan[i], t_last_bit)
+                    if t_first_bit <= node.next_event_time <= t_last_bit:
+                        self.update_node_event_times(node, t_last_bit)
 
                 # Packet successfully transmitted, remove and updated counters
-                self.lan[sender].collisions = 0
-                self.lan[sender].events.popleft()
-                if len(self.lan[sender].events) > 0 and \
-                        self.lan[sender].events[0].event_time > self.lan[sender].next_event_time:
-                    self.lan[sender].next_event_time = self.lan[sender].events[0].event_time
+                sender_node.collisions = 0
+                sender_node.pop()
+                if sender_node.queue_length() > 0 and sender_node.head_time() > sender_node.next_event_time:
+                    self.set_next_event_time(sender_node, sender_node.head_time())
                 successfully_transmitted += 1
 
-            # Update packet and collision count
+            # Update packet, frame and collision count
             self.total_packets += 1
+            self.frames += 1
             total_collisions += curr_collisions
+            if trace is not None:
+                trace.write_row((self.timer, sender, curr_collisions))
+
+            if instrument:
+                self.instrumentation.add_time('frame handling', perf_counter() - frame_start)
+
+            if self.timer >= next_snapshot:
+                self.save_snapshot(successfully_transmitted, total_collisions)
+                next_snapshot = self.next_snapshot_time()
+
+        return successfully_transmitted, total_collisions
+
+    # Removes the packet at the head of each given node's queue
+    # A node whose queue becomes empty is never selected as a sender again
+    def pop_packets(self, indices):
+        for i in indices.tolist():
+            node = self.lan[i]
+            node.pop()
+            if node.queue_length() > 0:
+                self.head_times[i] = node.head_time()
+            else:
+                self.head_times[i] = np.inf
+                self.next_times[i] = np.inf
+
+    # Returns exponential backoff times for the given numbers of collisions (or busy senses)
+    def backoff_times(self, counts):
+        return self.streams.backoff.generator.integers(0, np.left_shift(1, counts)) * 512 / c.R
+
+    # Vectorized handle_collision: updates the collision counts and event times of the given collided nodes
+    def collide(self, indices, waiting_starts):
+        self.collision_counts[indices] += 1
+        self.busy_counts[indices] = 0
+
+        dropped = self.collision_counts[indices] > c.K_max
+        if dropped.any():
+            dropped_indices = indices[dropped]
+            self.collision_counts[dropped_indices] = 0
+            self.dropped_packets += len(dropped_indices)
+            self.pop_packets(dropped_indices)
+            self.next_times[dropped_indices] = np.maximum(self.next_times[dropped_indices],
+                                                          self.head_times[dropped_indices])
+
+        indices = indices[~dropped]
+        waiting_starts = waiting_starts[~dropped] + self.backoff_times(self.collision_counts[indices])
+        self.next_times[indices] = np.maximum(waiting_starts, self.head_times[indices])
+
+    # Vectorized update_node_event_times: defers the given nodes that sensed the bus as busy
+    def defer(self, indices, waiting_starts):
+        if self.non_persistent:
+            self.busy_counts[indices] += 1
+            waiting_starts = waiting_starts + self.backoff_times(self.busy_counts[indices])
+
+            dropped = self.busy_counts[indices] > c.K_max
+            if dropped.any():
+                dropped_indices = indices[dropped]
+                self.busy_counts[dropped_indices] = 0
+                self.dropped_packets += len(dropped_indices)
+                self.total_packets += len(dropped_indices)
+                self.pop_packets(dropped_indices)
+                indices = indices[~dropped]
+                waiting_starts = waiting_starts[~dropped]
+
+        self.next_times[indices] = np.maximum(waiting_starts, self.head_times[indices])
+
+    # Copies the per-node state of the populated LanNode objects into the arrays used by the vectorized mode
+    def load_arrays(self):
+        self.next_times = np.array([node.next_event_time for node in self.lan])
+        self.head_times = self.next_times.copy()
+        self.collision_counts = np.zeros(self.N, dtype=np.int64)
+        self.busy_counts = np.zeros(self.N, dtype=np.int64)
+
+    # Runs the simulation with the per-node state in NumPy arrays, starting from the given counts (non-zero when
+    # resuming from a snapshot)
+    # The first/last bit windows, collided nodes and deferring nodes of each frame come from array operations
+    # Returns (successfully transmitted packets, total collisions)
+    def simulate_vectorized(self, successfully_transmitted=0, total_collisions=0):
+        instrument = self.instrument
+        trace = self.trace
+        next_snapshot = self.next_snapshot_time()
+
+        while self.timer < self.T:
+            if instrument:
+                selection_start = perf_counter()
+            sender = int(np.argmin(self.next_times))
+            if instrument:
+                frame_start = perf_counter()
+                self.instrumentation.add_time('sender selection', frame_start - selection_start)
+            if self.next_times[sender] >= self.T:
+                break
+            self.timer = self.next_times.item(sender)
+            self.busy_counts[sender] = 0
+
+            # Determine upper and lower bounds (when packet is transmitting) at every node
+            delays = self.topology.delays(sender)
+            t_first_bit = self.timer + delays
+            t_last_bit = t_first_bit + c.t_trans
+
+            # Nodes that cannot detect the line is busy collide
+            collided = self.next_times < t_first_bit
+            collided[sender] = False
+            collided_indices = np.flatnonzero(collided)
+            curr_collisions = len(collided_indices)
+
+            if curr_collisions > 0 and self.jamming:
+                # Collided nodes stop once the sender's first bit reaches them and jam the bus; the sender stops once
+                # it hears the first of them, and other nodes sense the bus as busy until its jamming signal has passed
+                detection_time = np.min(self.next_times[collided_indices] + delays[collided_indices])
+                self.collide(collided_indices, t_first_bit[collided_indices] + c.jamming_time)
+                self.total_packets += curr_collisions
+
+                sender_end = min(detection_time, self.timer + c.t_trans) + c.jamming_time
+                self.collide(np.array([sender]), np.array([sender_end]))
+                curr_collisions += 1
+
+                t_jam_end = sender_end + delays
+                busy = (t_first_bit <= self.next_times) & (self.next_times <= t_jam_end)
+                busy[collided_indices] = False
+                busy[sender] = False
+                busy_indices = np.flatnonzero(busy)
+                self.defer(busy_indices, t_jam_end[busy_indices])
+
+            elif curr_collisions > 0:
+                self.collide(collided_indices, t_last_bit[collided_indices])
+                self.total_packets += curr_collisions
+
+                # Handle collision on sender last
+                self.collide(np.array([sender]), np.array([self.timer + c.t_trans]))
+                curr_collisions += 1
+
+            else:
+                # Nodes that sense the line is busy wait to transmit
+                busy = (t_first_bit <= self.next_times) & (self.next_times <= t_last_bit)
+                busy_indices = np.flatnonzero(busy)
+                self.defer(busy_indices, t_last_bit[busy_indices])
+
+                # Packet successfully transmitted, remove and updated counters
+                self.collision_counts[sender] = 0
+                self.pop_packets(np.array([sender]))
+                self.next_times[sender] = max(self.next_times[sender], self.head_times[sender])
+                successfully_transmitted += 1
+
+            # Update packet, frame and collision count
+            self.total_packets += 1
+            self.frames += 1
+            total_collisions += curr_collisions
+            if trace is not None:
+                trace.write_row((self.timer, sender, curr_collisions))
+
+            if instrument:
+                self.instrumentation.add_time('frame handling', perf_counter() - frame_start)
+
+            if self.timer >= next_snapshot:
+                self.save_snapshot(successfully_transmitted, total_collisions)
+                next_snapshot = self.next_snapshot_time()
+
+        return successfully_transmitted, total_collisions
+
+    # Returns the path of this configuration's snapshot file
+    def snapshot_path(self):
+        return os.path.join(self.snapshot_dir, 'lan_{}.pkl'.format(checkpoint.ResultStore.digest(self.key)))
+
+    # Returns the simulated time of the next snapshot (inf if snapshots are off)
+    def next_snapshot_time(self):
+        return np.inf if self.snapshot_dir is None else self.timer + self.snapshot_interval
+
+    # Saves the state of the simulation, with the counts kept by the simulation loop, to the snapshot file
+    def save_snapshot(self, successfully_transmitted, total_collisions):
+        state = {name: getattr(self, name) for name in SNAPSHOT_STATE}
+        state['counts'] = (successfully_transmitted, total_collisions)
+        checkpoint.save_snapshot(self.snapshot_path(), self.key, state)
+
+    # Restores the state of the simulation from the snapshot file, if there is one
+    # Returns the (successfully transmitted packets, total collisions) counts to resume the simulation loop from, or
+    # None if there is no snapshot
+    def restore_snapshot(self):
+        state = checkpoint.load_snapshot(self.snapshot_path(), self.key)
+        if state is None:
+            return None
+        counts = state.pop('counts')
+        for name, value in state.items():
+            setattr(self, name, value)
+        return counts
+
+    # Runs the simulation (resuming from a snapshot if there is one)
+    # Returns (successfully transmitted packets, total collisions)
+    def run_simulation(self):
+        # Resume from a snapshot if there is one, otherwise populate the nodes
+        counts = self.restore_snapshot() if self.snapshot_dir is not None else None
+        if counts is None:
+            counts = (0, 0)
+            self.instrumentation.start('population')
+            self.populate_lan()
+            if self.vectorized:
+                self.load_arrays()
+            self.instrumentation.stop()
+        elif self.verbose:
+            print('Resuming N = {}, A = {} from t = {}'.format(self.N, self.A, self.timer))
+
+        self.instrumentation.start('simulation')
+        if self.vectorized:
+            successfully_transmitted, total_collisions = self.simulate_vectorized(*counts)
+        else:
+            successfully_transmitted, total_collisions = self.simulate(*counts)
+        self.instrumentation.stop()
+
+        if self.snapshot_dir is not None:
+            checkpoint.remove_snapshot(self.snapshot_path())
+
+        self.instrumentation.count('frames', self.frames)
+        self.instrumentation.count('successful transmissions', successfully_transmitted)
+        self.instrumentation.count('collisions', total_collisions)
+        self.instrumentation.count('dropped packets', self.dropped_packets)
 
         unserviced_events = 0
         for n in self.lan:
-            unserviced_events += len(n.events)
+            unserviced_events += n.queue_length()
         self.total_packets += unserviced_events
 
+        return successfully_transmitted, total_collisions
+
+    # Main method which runs the simulation, or takes its counts from the cache if it has been run before
+    def run_des(self):
+        cache_key = None
+        cached = None
+        if self.cache is not None and self.seed is not None:
+            cache_key = self.cache.key(config=self.key)
+            cached = self.cache.get(cache_key)
+
+        if cached is not None:
+            successfully_transmitted, total_collisions, self.total_packets, self.dropped_packets, self.frames = cached
+            self.instrumentation.count('cache hits')
+        else:
+            successfully_transmitted, total_collisions = self.run_simulation()
+            if cache_key is not None:
+                self.cache.put(cache_key, [successfully_transmitted, total_collisions, self.total_packets,
+                                           self.dropped_packets, self.frames])
+
         # Print and return computed metrics
-        print('N =', self.N)
-        print('Successfully transmitted:', successfully_transmitted)
-        print('Total packets:', self.total_packets)
-        print('Efficiency:', successfully_transmitted * 1.0 / self.total_packets)
-        print('Throughput:', successfully_transmitted * c.L / self.T)
-        print('Total collisions:', total_collisions)
-        print('Dropped packets:', self.dropped_packets)
+        if self.verbose:
+            print('N =', self.N)
+            print('Successfully transmitted:', successfully_transmitted)
+            print('Total packets:', self.total_packets)
+            print('Efficiency:', successfully_transmitted * 1.0 / self.total_packets)
+            print('Throughput:', successfully_transmitted * c.L / self.T)
+            print('Total collisions:', total_collisions)
+            print('Dropped packets:', self.dropped_packets)
 
         # [N, A, efficiency, throughput]
         return [self.N, self.A, successfully_transmitted * 1.0 / self.total_packets, successfully_transmitted * c.L / self.T]
+
+
+# Returns the key identifying a LAN configuration run with the given seed (an int or a SeedSequence) in a ResultStore
+# or snapshot; options are any other parameters the result depends on (e.g. replication options)
+# The topology and jamming are only part of the key when they are set, so keys of the default bus are unchanged
+def config_key(N, A, T, non_persistent, vectorized, seed, topology=None, jamming=False, **options):
+    if isinstance(seed, np.random.SeedSequence):
+        seed = [seed.entropy, list(seed.spawn_key)]
+    if topology is not None:
+        options['topology'] = topology.key()
+    if jamming:
+        options['jamming'] = True
+    return checkpoint.ResultStore.key(N=N, A=A, T=T, non_persistent=non_persistent, vectorized=vectorized, seed=seed,
+                                      L=c.L, R=c.R, **options)
+
+
+# Returns a seed for each of count configurations run one after another, spawned from seed, so they get independent
+# traffic and backoff streams; without a seed, every configuration draws fresh entropy (and is not cached)
+def spawn_seeds(seed, count):
+    if seed is None:
+        return [None] * count
+    return np.random.SeedSequence(seed).spawn(count)
+
+
+# Writes a result row to the sink (if there is one) and flushes it, so finished rows survive a crash
+def write_row(sink, row):
+    if sink is not None:
+        sink.write_row(row)
+        sink.flush()
+
+
+# Runs a single replication of a LAN configuration, seeded from seed_sequence, and returns [efficiency, throughput]
+def run_replication(N, A, T, non_persistent, vectorized, cache, topology, jamming, seed_sequence):
+    lan_des = LAN_DES(N, A, T, non_persistent, seed=seed_sequence, vectorized=vectorized, cache=cache,
+                      topology=topology, jamming=jamming)
+    return lan_des.run_des()[2:]
+
+
+# Runs independent replications of each (N, A) configuration until the 95% confidence intervals of efficiency and
+# throughput are within the target relative half-width (options are passed to run_replications)
+# With a ResultStore, configurations already in it are not run again, and every other one is added as it finishes;
+# with a seed, each replication is also cached in the optional ResultCache, and each row is written to the optional
+# result sink as soon as its configuration finishes
+# layout optionally builds the BusTopology of each N (see bus_topology.parse_topology), and jamming models jamming
+# signals after collisions
+# Returns [N, A, efficiency, efficiency CI, throughput, throughput CI, replications] for each configuration
+def run_replicated_sweep(configs, T, non_persistent=False, seed=None, workers=None, vectorized=False, store=None,
+                         cache=None, sink=None, layout=None, jamming=False, **options):
+    cache = cache if seed is not None else None
+    executor = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(configs))
+    results = []
+    try:
+        for (N, A), seed_sequence in zip(configs, seed_sequences):
+            topology = layout(N) if layout is not None else None
+            key = config_key(N, A, T, non_persistent, vectorized, seed_sequence, topology, jamming,
+                             replications=options)
+            if store is not None and key in store:
+                results.append(store.get(key))
+                write_row(sink, results[-1])
+                continue
+
+            run = partial(run_replication, N, A, T, non_persistent, vectorized, cache, topology, jamming)
+            means, half_widths, replications = run_replications(run, seed_sequence, executor=executor,
+                                                                batch_size=workers or 1, **options)
+            result = [N, A, means[0], half_widths[0], means[1], half_widths[1], replications]
+            print('N = {}, A = {}: efficiency {} +/- {}, throughput {} +/- {} ({} replications)'.format(*result))
+            results.append(result)
+            write_row(sink, result)
+            if store is not None:
+                store.put(key, result)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return results
+
+
+# Runs a single LAN configuration in a worker process and returns [N, A, efficiency, throughput]
+def run_config(N, A, T, non_persistent, vectorized, seed_sequence, snapshot_dir=None, snapshot_interval=None,
+               cache=None, topology=None, jamming=False):
+    lan_des = LAN_DES(N, A, T, non_persistent, seed=seed_sequence, vectorized=vectorized, verbose=False,
+                      snapshot_dir=snapshot_dir, snapshot_interval=snapshot_interval, cache=cache, topology=topology,
+                      jamming=jamming)
+    return lan_des.run_des()
+
+
+# Runs every (persistence mode, A, N) configuration of the grid across a process pool, each with its own seed, and
+# prints progress as configurations finish
+# With a ResultStore, configurations already in it are not run again, and every other one is added as it finishes;
+# with a snapshot directory, each running configuration is also saved every snapshot_interval simulated seconds, and
+# with a seed, each configuration is cached in the optional ResultCache
+# sinks optionally maps persistence modes to result sinks, which each mode's rows are written to (ordered by A then N)
+# as soon as they are available
+# layout optionally builds the BusTopology of each N (see bus_topology.parse_topology), and jamming models jamming
+# signals after collisions
+# Returns a dict mapping each persistence mode to its [N, A, efficiency, throughput] rows, ordered by A then N
+def run_grid(N_values, A_values, modes, T, seed=None, workers=None, vectorized=False, store=None, snapshot_dir=None,
+             snapshot_interval=None, cache=None, sinks=None, layout=None, jamming=False):
+    cache = cache if seed is not None else None
+    configs = [(mode, N, A) for mode in modes for A in A_values for N in N_values]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(configs))
+    results = {}
+    sinks = sinks or {}
+
+    # Each N's topology is built once, so every configuration with that N runs on the same bus
+    topologies = {N: layout(N) if layout is not None else None for N in N_values}
+
+    # Index of the first configuration not yet written to its sink
+    written = 0
+
+    def write_ready_rows():
+        nonlocal written
+        while written < len(configs) and configs[written] in results:
+            write_row(sinks.get(configs[written][0]), results[configs[written]])
+            written += 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for (mode, N, A), seed_sequence in zip(configs, seed_sequences):
+            non_persistent = mode == c.MODE_NON_PERSISTENT
+            key = config_key(N, A, T, non_persistent, vectorized, seed_sequence, topologies[N], jamming)
+            if store is not None and key in store:
+                results[(mode, N, A)] = store.get(key)
+                continue
+            future = executor.submit(run_config, N, A, T, non_persistent, vectorized, seed_sequence, snapshot_dir,
+                                     snapshot_interval, cache, topologies[N], jamming)
+            futures[future] = (mode, N, A, key)
+
+        if len(results) > 0:
+            print('{} of {} configurations already in the results store'.format(len(results), len(configs)))
+        write_ready_rows()
+
+        for completed, future in enumerate(as_completed(futures), len(results) + 1):
+            mode, N, A, key = futures[future]
+            results[(mode, N, A)] = future.result()
+            if store is not None:
+                store.put(key, results[(mode, N, A)])
+            print('[{}/{}] {}: N = {}, A = {}, efficiency = {}, throughput = {}'.format(
+                completed, len(configs), mode, N, A, *results[(mode, N, A)][2:]))
+            write_ready_rows()
+
+    return {mode: [results[(m, N, A)] for m, N, A in configs if m == mode] for mode in modes}
@@ -1,13 +1,28 @@
-from collections import deque
+class LanNode:
+    def __init__(self, arrivals, index):
+        # Position of the node on the bus
+        self.index = index
 
+        # Sorted array of packet arrival times; packets before the head index have left the queue
+        self.arrivals = arrivals
+        self.head = 0
 
-class LanNode:
-    def __init__(self, events):
-        self.events = deque(events)
         self.collisions = 0
         self.busy_count = 0
 
         # Virtual event time that tracks the actual time of the first event in the queue.
         # This is done so that multiple events are not updated for each node, which greatly
         # decreases the runtime of the code
-        self.next_event_time = events[0].event_time
+        self.next_event_time = arrivals.item(0)
+
+    # Returns the number of packets left in the queue
+    def queue_length(self):
+        return len(self.arrivals) - self.head
+
+    # Returns the arrival time of the packet at the head of the queue
+    def head_time(self):
+        return self.arrivals.item(self.head)
+
+    # Removes the packet at the head of the queue
+    def pop(self):
+        self.head += 1
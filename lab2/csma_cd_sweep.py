@@ -0,0 +1,46 @@
+import argparse
+
+from classes.bus_topology import TOPOLOGY_NAMES, parse_topology
+from classes.lan_des import run_grid
+from common.cache import ResultCache
+from common.checkpoint import ResultStore
+from common.sinks import open_sink
+from utils import constants as c
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the CSMA/CD (N, A) grid for one or both persistence modes')
+    parser.add_argument('--N', type=int, nargs='+', default=[20, 40, 60, 80, 100], help='numbers of nodes')
+    parser.add_argument('--A', type=int, nargs='+', default=[7, 10, 20], help='average packet arrival rates')
+    parser.add_argument('--modes', nargs='+', choices=[c.MODE_PERSISTENT, c.MODE_NON_PERSISTENT],
+                        default=[c.MODE_PERSISTENT, c.MODE_NON_PERSISTENT])
+    parser.add_argument('--T', type=float, default=1000, help='simulation time')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (defaults to the CPU count)')
+    parser.add_argument('--vectorized', action='store_true', help='keep per-node state in NumPy arrays')
+    parser.add_argument('--topology', type=parse_topology, default=None,
+                        help='placement of the nodes: {} (default N nodes D apart on one segment)'.format(
+                            ', '.join(TOPOLOGY_NAMES)))
+    parser.add_argument('--jamming', action='store_true', help='send jamming signals after collisions')
+    parser.add_argument('--cache-dir', default=None, help='directory to cache the results of seeded runs in')
+    parser.add_argument('--cache-size', type=float, default=64, help='size limit of the cache in MB')
+    parser.add_argument('--results-store', default=None,
+                        help='file to save finished configurations to; configurations already in it are skipped')
+    parser.add_argument('--snapshot-dir', default=None, help='directory to save snapshots of running configurations to')
+    parser.add_argument('--snapshot-interval', type=float, default=100,
+                        help='simulated seconds between snapshots of a running configuration')
+    parser.add_argument('--format', choices=['csv', 'npy'], default='csv', help='format of the result files')
+    args = parser.parse_args()
+
+    headers = ['N', 'A', 'Efficiency', 'Throughput']
+    store = ResultStore(args.results_store) if args.results_store else None
+    cache = ResultCache(args.cache_dir, c, int(args.cache_size * 1024 * 1024)) if args.cache_dir else None
+
+    # Each mode's rows are written to its file as the configurations finish
+    sinks = {mode: open_sink('{}_csma_cd.{}'.format(mode.replace('-', '_'), args.format), headers)
+             for mode in args.modes}
+    try:
+        run_grid(args.N, args.A, args.modes, args.T, args.seed, args.workers, args.vectorized, store,
+                 args.snapshot_dir, args.snapshot_interval, cache, sinks, args.topology, args.jamming)
+    finally:
+        for sink in sinks.values():
+            sink.close()
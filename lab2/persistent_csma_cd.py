@@ -1,14 +1,51 @@
-from classes.lan_des import LAN_DES
-from utils.utils import write_to_csv
+import argparse
 
-file = 'persistent_csma_cd.csv'
-headers = ['N', 'A', 'Efficiency', 'Throughput']
-data = []
+from classes.bus_topology import TOPOLOGY_NAMES, parse_topology
+from classes.lan_des import LAN_DES, run_replicated_sweep, spawn_seeds
+from common.cache import ResultCache
+from common.sinks import open_sink
+from utils import constants as c
 
-for A in [7, 10, 20]:
-    print('A =', A)
-    for N in [20, 40, 60, 80, 100]:
-        lan_des = LAN_DES(N, A, 1000)
-        data.append(lan_des.run_des())
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--replications', type=int, default=None,
+                        help='maximum number of independent replications per point (single run if not given)')
+    parser.add_argument('--target', type=float, default=0.05,
+                        help='stop replicating once every 95%% CI half-width is within this fraction of the mean')
+    parser.add_argument('--vectorized', action='store_true', help='keep per-node state in NumPy arrays')
+    parser.add_argument('--cache-dir', default=None, help='directory to cache the results of seeded runs in')
+    parser.add_argument('--cache-size', type=float, default=64, help='size limit of the cache in MB')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes to run replications in')
+    parser.add_argument('--topology', type=parse_topology, default=None,
+                        help='placement of the nodes: {} (default N nodes D apart on one segment)'.format(
+                            ', '.join(TOPOLOGY_NAMES)))
+    parser.add_argument('--jamming', action='store_true', help='send jamming signals after collisions')
+    parser.add_argument('--output', default='persistent_csma_cd.csv',
+                        help='file to write the results to (.csv or .npy)')
+    args = parser.parse_args()
 
-write_to_csv(file, headers, data)
+    headers = ['N', 'A', 'Efficiency', 'Throughput']
+    cache = ResultCache(args.cache_dir, c, int(args.cache_size * 1024 * 1024)) if args.cache_dir else None
+
+    if args.replications:
+        headers = ['N', 'A', 'Efficiency', 'Efficiency 95% CI half-width', 'Throughput',
+                   'Throughput 95% CI half-width', 'Replications']
+
+    # Rows are written to the output file as the configurations finish
+    configs = [(N, A) for A in [7, 10, 20] for N in [20, 40, 60, 80, 100]]
+    with open_sink(args.output, headers) as sink:
+        if args.replications:
+            run_replicated_sweep(configs, 1000, seed=args.seed, workers=args.workers, vectorized=args.vectorized,
+                                 cache=cache, sink=sink, max_replications=args.replications, target=args.target,
+                                 layout=args.topology, jamming=args.jamming)
+        else:
+            # Each configuration gets its own seed, so they do not replay the same traffic and backoff streams
+            for (N, A), seed in zip(configs, spawn_seeds(args.seed, len(configs))):
+                if N == configs[0][0]:
+                    print('A =', A)
+                topology = args.topology(N) if args.topology else None
+                lan_des = LAN_DES(N, A, 1000, seed=seed, vectorized=args.vectorized, cache=cache,
+                                  topology=topology, jamming=args.jamming)
+                sink.write_row(lan_des.run_des())
+                sink.flush()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+# Profiles a single LAN_DES configuration: per-phase timings and counters, and optionally cProfile or a sampling
+# profiler over the whole run
+
+import argparse
+
+from classes.bus_topology import TOPOLOGY_NAMES, parse_topology
+from classes.lan_des import LAN_DES
+from common import profiling
+from common.sinks import open_sink
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--N', type=int, default=100)
+    parser.add_argument('--A', type=float, default=20)
+    parser.add_argument('--T', type=float, default=10, help='simulation time')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--non-persistent', action='store_true')
+    parser.add_argument('--vectorized', action='store_true', help='keep per-node state in NumPy arrays')
+    parser.add_argument('--topology', type=parse_topology, default=None,
+                        help='placement of the nodes: {} (default N nodes D apart on one segment)'.format(
+                            ', '.join(TOPOLOGY_NAMES)))
+    parser.add_argument('--jamming', action='store_true', help='send jamming signals after collisions')
+    parser.add_argument('--profiler', choices=['none', 'cprofile', 'sample'], default='none')
+    parser.add_argument('--interval', type=float, default=0.001, help='sampling interval in seconds')
+    parser.add_argument('--no-instrument', action='store_true', help='turn off the per-phase timers and counters')
+    parser.add_argument('--trace', default=None, help='file to write the outcome of every frame to (.csv or .npy)')
+    args = parser.parse_args()
+
+    trace = open_sink(args.trace, ['time', 'sender', 'collisions']) if args.trace else None
+    topology = args.topology(args.N) if args.topology else None
+    lan_des = LAN_DES(args.N, args.A, args.T, args.non_persistent, seed=args.seed, vectorized=args.vectorized,
+                      instrument=not args.no_instrument, trace=trace, topology=topology, jamming=args.jamming)
+
+    if args.profiler == 'cprofile':
+        profiling.run_cprofile(lan_des.run_des)
+    elif args.profiler == 'sample':
+        profiling.run_sampling_profile(lan_des.run_des, args.interval)
+    else:
+        lan_des.run_des()
+
+    if trace is not None:
+        trace.close()
+    lan_des.instrumentation.report()
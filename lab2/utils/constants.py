@@ -6,5 +6,10 @@ S = (2/3) * C
 t_prop = D / S
 t_trans = L / R
 jamming_time = 48 / R
+t_repeater = 8 / R
 
 K_max = 10
+
+# Persistence modes
+MODE_PERSISTENT = 'persistent'
+MODE_NON_PERSISTENT = 'non-persistent'
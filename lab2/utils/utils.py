@@ -1,28 +1,32 @@
 # Util functions for Lab 1
 
-import csv
-import math
-from random import random, randrange
+import numpy as np
 
 from . import constants as c
 
 
-# Returns an exponential random variable
-def get_random_variable(mean):
-    return -mean*math.log(1-random())
+# Returns an exponential random variable drawn from the given RandomStream
+def get_random_variable(mean, stream):
+    return stream.exponential(mean)
 
 
-# Calculates exponential backoff given number of collisions
-def get_exponential_backoff(collisions):
-    return randrange(0, 2**collisions) * 512 / c.R
+# Returns a sorted array of exponentially distributed arrival times, up to and including the first arrival past T
+# Inter-arrival times are drawn in blocks and cumulatively summed until T is passed.
+def generate_arrival_times(rng, mean, T):
+    blocks = []
+    curr_time = 0.0
 
+    # Size the first block so that it usually covers the whole horizon
+    size = int(T / mean * 1.05) + 16
+    while curr_time < T:
+        times = curr_time + np.cumsum(rng.exponential(mean, size))
+        blocks.append(times)
+        curr_time = times[-1]
 
-# Writes the results to the corresponding CSV file.
-def write_to_csv(file, headers, data):
-    with open(file, mode='w', newline='') as output_file:
-        output_writer = csv.writer(output_file, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-        output_writer.writerow(headers)
-        for result in data:
-            output_writer.writerow(result)
+    times = np.concatenate(blocks)
+    return times[:np.searchsorted(times, T, side='right') + 1]
 
-    print('Results written to {}'.format(file))
+
+# Calculates exponential backoff given number of collisions, drawn from the given RandomStream
+def get_exponential_backoff(collisions, stream):
+    return stream.randbelow(2**collisions) * 512 / c.R
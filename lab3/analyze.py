@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+# Verifies the checksums of every packet in one or more captures and groups the packets into flows
+
+import argparse
+
+import numpy as np
+
+from utils import analysis, constants as c, decoder, flows
+from common import sinks
+
+STATUS_NAMES = ['not checked', 'valid', 'invalid', 'truncated']
+
+FLOW_HEADERS = ['ip_src', 'ip_dst', 'src_port', 'dst_port', 'ip_protocol', 'packets', 'bytes', 'payload_bytes', 'first',
+                'last', 'gaps', 'gap_mean', 'gap_std', 'gap_min', 'gap_max']
+FLOW_TYPES = [np.uint32, np.uint32, np.uint16, np.uint16, np.uint8, np.int64, np.int64, np.int64, np.float64,
+              np.float64, np.int64, np.float64, np.float64, np.float64, np.float64]
+
+
+# Prints the number of packets with each checksum status
+def print_checksums(name, counts):
+    print('{} checksums: {}'.format(name, ', '.join('{} {}'.format(count, status)
+                                                     for status, count in zip(STATUS_NAMES, counts.tolist()))))
+
+
+# Prints the flows with the most bytes
+def print_flows(table, top):
+    mean, std = flows.gap_statistics(table)
+    print('{:<44}{:>6}{:>10}{:>10}{:>14}{:>14}'.format('flow', 'proto', 'packets', 'bytes', 'mean gap (s)',
+                                                     'std gap (s)'))
+    for i in np.argsort(-table['bytes'], kind='stable')[:top].tolist():
+        flow = table[i]
+        print('{:<44}{:>6}{:>10}{:>10}{:>14.6g}{:>14.6g}'.format(
+            '{}:{} > {}:{}'.format(decoder.format_ip(flow['ip_src']), flow['src_port'],
+                                   decoder.format_ip(flow['ip_dst']), flow['dst_port']),
+            flows.protocol_name(flow['ip_protocol']), flow['packets'], flow['bytes'], mean[i], std[i]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('captures', nargs='+', help='hex dump or pcap files, analyzed as one capture')
+    parser.add_argument('--bidirectional', action='store_true',
+                        help='count both directions of a connection as one flow')
+    parser.add_argument('--no-checksums', action='store_true', help='skip checksum verification')
+    parser.add_argument('--top', type=int, default=10, help='number of flows to print, by bytes')
+    parser.add_argument('--block-size', type=int, default=c.BLOCK_SIZE, help='number of packets decoded per block')
+    parser.add_argument('--flows', default=None, help='file to write the flow table to (.csv or .npy)')
+    parser.add_argument('--interarrivals', default=None,
+                        help='.npy file to write the packet inter-arrival times to, in seconds')
+    args = parser.parse_args()
+
+    interarrivals = None if args.interarrivals is None else \
+        sinks.NpySink(args.interarrivals, ['interarrival'], [np.float64])
+    capture_analysis = analysis.CaptureAnalysis(flows.FlowTable(args.bidirectional), not args.no_checksums,
+                                                interarrivals)
+    for path in args.captures:
+        capture_analysis.add_capture(path, args.block_size)
+    if interarrivals is not None:
+        interarrivals.close()
+
+    table = capture_analysis.table.table()
+    print('{} packets, {} flows'.format(capture_analysis.packets, len(table)))
+    if not args.no_checksums:
+        print_checksums('IPv4', capture_analysis.ip_checksums)
+        print_checksums('TCP/UDP', capture_analysis.l4_checksums)
+    print_flows(table, args.top)
+
+    if args.flows:
+        mean, std = flows.gap_statistics(table)
+        with sinks.open_sink(args.flows, FLOW_HEADERS, FLOW_TYPES) as sink:
+            for flow, gap_mean, gap_std in zip(table, mean.tolist(), std.tolist()):
+                sink.write_row([flow[header].item() for header in FLOW_HEADERS[:11]] + [gap_mean, gap_std] +
+                               [flow['gap_min'].item(), flow['gap_max'].item()])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+# Benchmarks the capture decoder (and the checksum and flow analysis) on synthetic pcap and hex dump captures
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from utils import analysis, capture, constants as c, decoder, flows, synthetic
+from common import benchmark
+
+FORMATS = ['pcap', 'hex']
+
+
+# Decodes a capture and returns the number of packets decoded
+def run_workload(path, block_size):
+    return sum(len(records) for records in decoder.decode_capture(path, block_size))
+
+
+# Verifies the checksums of a capture and builds its flow table; returns the number of packets analyzed
+def run_analysis(path, block_size):
+    capture_analysis = analysis.CaptureAnalysis(flows.FlowTable())
+    capture_analysis.add_capture(path, block_size)
+    return capture_analysis.packets
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--packets', type=int, default=200000, help='number of packets in the synthetic pcap capture')
+    parser.add_argument('--hex-packets', type=int, default=20000,
+                        help='number of packets in the synthetic hex dump capture')
+    parser.add_argument('--block-size', type=int, default=c.BLOCK_SIZE, help='number of packets decoded per block')
+    parser.add_argument('--analysis', action='store_true',
+                        help='also benchmark checksum verification and flow aggregation')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--directory', default=None,
+                        help='directory to write the synthetic captures to (a temporary directory if not given)')
+    parser.add_argument('--output', default='benchmark.json', help='file to save the results to')
+    parser.add_argument('--baseline', default=None, help='results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fraction by which wall time or peak RSS may exceed the baseline')
+    parser.add_argument('--capture', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--analyze', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: decode one capture and print its measurements
+    if args.capture:
+        workload = run_analysis if args.analyze else run_workload
+        result = benchmark.measure(lambda: workload(args.capture, args.block_size))
+        print(json.dumps(result))
+        sys.exit()
+
+    # Synthetic captures written to a temporary directory are removed once they have been benchmarked
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        directory = args.directory or temporary_directory
+        os.makedirs(directory, exist_ok=True)
+        counts = {'pcap': args.packets, 'hex': args.hex_packets}
+        writers = {'pcap': capture.write_pcap, 'hex': capture.write_hex_dump}
+
+        results = {}
+        for capture_format in args.formats:
+            path = os.path.join(directory, 'synthetic_{}.{}'.format(counts[capture_format],
+                                                                   'pcap' if capture_format == 'pcap' else 'txt'))
+            if not os.path.exists(path):
+                print('Writing', path)
+                writers[capture_format](path, synthetic.synthetic_packets(counts[capture_format], seed=args.seed))
+
+            name = '{}/{}'.format(capture_format, counts[capture_format])
+            print('Running {} ({:.1f} MB)'.format(name, os.path.getsize(path) / (1024.0 * 1024)))
+            results[name] = benchmark.run_in_subprocess(__file__, ['--capture', path, '--block-size',
+                                                                   str(args.block_size)])
+            if args.analysis:
+                name = '{}-analysis/{}'.format(capture_format, counts[capture_format])
+                print('Running', name)
+                results[name] = benchmark.run_in_subprocess(__file__, ['--capture', path, '--block-size',
+                                                                       str(args.block_size), '--analyze'])
+
+    benchmark.print_results(results)
+    benchmark.save_results(results, args.output)
+
+    if args.baseline:
+        regressions = benchmark.find_regressions(results, benchmark.load_results(args.baseline), args.tolerance)
+        for regression in regressions:
+            print('Regression:', regression)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+# Decodes the Ethernet/IPv4/TCP headers of every packet in a capture (tcpdump -X hex dump or pcap file)
+
+import argparse
+
+import numpy as np
+
+from utils import constants as c, decoder
+
+
+STATUS_NAMES = ['', ' (valid)', ' (invalid)', ' (truncated)']
+
+
+# Prints the decoded headers of one packet
+def print_record(index, record):
+    print('Packet {} ({} bytes{})'.format(index, record['length'], '' if np.isnan(record['timestamp']) else
+                                          ', t = {:.6f}'.format(record['timestamp'])))
+    print('  Ethernet: {} > {}, type 0x{:04x}'.format(decoder.format_mac(record['eth_src']),
+                                                      decoder.format_mac(record['eth_dst']), record['ethertype']))
+    if record['ip_header_length'] == 0:
+        return
+    print('  IPv4: {} > {}, header {} bytes, total length {}, id 0x{:04x}, ttl {}, protocol {}, checksum 0x{:04x}{}'
+          .format(decoder.format_ip(record['ip_src']), decoder.format_ip(record['ip_dst']),
+                  record['ip_header_length'], record['ip_total_length'], record['ip_id'], record['ip_ttl'],
+                  record['ip_protocol'], record['ip_checksum'], STATUS_NAMES[record['ip_checksum_status']]))
+    if record['ip_protocol'] == c.PROTOCOL_TCP:
+        print('  TCP: port {} > {}, seq {}, ack {}, header {} bytes, flags [{}], window {}, checksum 0x{:04x}{}'.format(
+            record['src_port'], record['dst_port'], record['tcp_seq'], record['tcp_ack'], record['tcp_header_length'],
+            decoder.format_tcp_flags(record['tcp_flags']), record['tcp_window'], record['l4_checksum'],
+            STATUS_NAMES[record['l4_checksum_status']]))
+    elif record['ip_protocol'] == c.PROTOCOL_UDP:
+        print('  UDP: port {} > {}, checksum 0x{:04x}{}'.format(record['src_port'], record['dst_port'],
+                                                               record['l4_checksum'],
+                                                               STATUS_NAMES[record['l4_checksum_status']]))
+    print('  Payload: {} bytes at offset {}'.format(record['payload_length'], record['payload_offset']))
+    if record['tls_type'] > 0:
+        print('  TLS record: content type {}, version 0x{:04x}, length {}'.format(
+            record['tls_type'], record['tls_version'], record['tls_length']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('captures', nargs='+', help='hex dump or pcap files')
+    parser.add_argument('--summary', action='store_true', help='only print the packet counts of each capture')
+    parser.add_argument('--checksums', action='store_true', help='verify the IPv4 and TCP/UDP checksums')
+    args = parser.parse_args()
+
+    for path in args.captures:
+        print(path)
+        packets = 0
+        tls_records = 0
+        for records in decoder.decode_capture(path, checksums=args.checksums):
+            if not args.summary:
+                for index, record in enumerate(records, packets):
+                    print_record(index, record)
+            packets += len(records)
+            tls_records += int(np.count_nonzero(records['tls_type']))
+        print('{} packets, {} starting with a TLS record'.format(packets, tls_records))
@@ -0,0 +1,8 @@
+# Modules shared by the labs (e.g. the random streams) live in the common package at the root of the repository.
+# Importing utils (directly, or through classes) puts the root on the import path, so common can be imported after it
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
@@ -0,0 +1,48 @@
+# Batch analysis of captures: checksum verification, flow aggregation and the packet inter-arrival trace
+
+import numpy as np
+
+from . import constants as c, decoder
+
+
+class CaptureAnalysis:
+    ##
+    # Parameters: table -> the FlowTable packets are added to
+    #             checksums -> whether to verify the IPv4 and TCP/UDP checksums
+    #             interarrivals -> a sink the inter-arrival times between consecutive timestamped packets are written
+    #                              to, in seconds and in capture order (or None)
+    #
+    def __init__(self, table, checksums=True, interarrivals=None):
+        self.table = table
+        self.checksums = checksums
+        self.interarrivals = interarrivals
+        self.packets = 0
+        # Number of packets with each CHECKSUM_* status, for the IPv4 and the TCP/UDP checksums
+        self.ip_checksums = np.zeros(4, dtype=np.int64)
+        self.l4_checksums = np.zeros(4, dtype=np.int64)
+        self.last_timestamp = np.nan
+
+    ##
+    # Decodes a capture a block at a time and adds its packets; the inter-arrival trace continues across captures
+    #
+    def add_capture(self, path, block_size=c.BLOCK_SIZE):
+        for records in decoder.decode_capture(path, block_size, self.checksums):
+            self.add(records)
+
+    ##
+    # Adds a block of decoded header records
+    #
+    def add(self, records):
+        self.packets += len(records)
+        self.ip_checksums += np.bincount(records['ip_checksum_status'], minlength=4)
+        self.l4_checksums += np.bincount(records['l4_checksum_status'], minlength=4)
+        self.table.add(records)
+
+        timestamps = records['timestamp'][~np.isnan(records['timestamp'])]
+        if len(timestamps) == 0:
+            return
+        if self.interarrivals is not None:
+            if not np.isnan(self.last_timestamp):
+                timestamps = np.r_[self.last_timestamp, timestamps]
+            self.interarrivals.write_rows(np.diff(timestamps))
+        self.last_timestamp = timestamps[-1]
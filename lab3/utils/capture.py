@@ -0,0 +1,176 @@
+# Readers and writers for packet captures: tcpdump -X hex dumps (like f2.txt and f12.txt) and pcap files
+# Captures are memory-mapped and read one packet at a time, so memory stays constant however large the file is
+# Every reader yields (timestamp, offset, data) for each packet: the capture timestamp in seconds (nan if the capture
+# has none), the byte offset of the packet data in the file (-1 for hex dumps, whose bytes are decoded from text) and
+# the packet bytes (a memoryview into the mapped file for pcap files)
+
+import mmap
+import re
+import struct
+
+from . import constants as c
+
+# Timestamp at the start of a tcpdump summary line: seconds since the epoch (-tt) or the time of day (the default)
+EPOCH_TIMESTAMP = re.compile(rb'\s*(\d+\.\d+)\s')
+TIME_OF_DAY_TIMESTAMP = re.compile(rb'\s*(\d+):(\d+):(\d+\.\d+)\s')
+
+
+##
+# Memory-maps a file for reading
+# Returns: the mmap, or None if the file is empty (empty files cannot be mapped)
+#
+def map_file(capture_file):
+    try:
+        return mmap.mmap(capture_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        return None
+
+
+##
+# Closes a mapped file; if the caller still holds memoryviews into it, the mapping is left to the garbage collector
+#
+def close_map(mapped):
+    try:
+        mapped.close()
+    except BufferError:
+        pass
+
+
+##
+# Returns: the timestamp at the start of a tcpdump summary line, in seconds, or nan if there is none
+#
+def parse_timestamp(line):
+    match = EPOCH_TIMESTAMP.match(line)
+    if match:
+        return float(match.group(1))
+    match = TIME_OF_DAY_TIMESTAMP.match(line)
+    if match:
+        return int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3))
+    return float('nan')
+
+
+##
+# Reads a tcpdump -X (or -x) hex dump, where each packet is a run of lines like
+#     0x0010:  00db a8c8 4000 4006 44f1 8161 380d 68f4  ....@.@.D..a8.h.
+# optionally preceded by tcpdump's summary line. A packet ends at the next summary line or the next 0x0000 offset.
+# Yields: (timestamp, -1, data) for each packet
+#
+def read_hex_dump(path):
+    with open(path, 'rb') as capture_file:
+        mapped = map_file(capture_file)
+        if mapped is None:
+            return
+        try:
+            timestamp = float('nan')
+            data = bytearray()
+            for line in iter(mapped.readline, b''):
+                stripped = line.lstrip()
+                if stripped.startswith(b'0x'):
+                    offset, rest = stripped.split(b':', 1)
+                    if int(offset, 16) == 0 and len(data) > 0:
+                        yield timestamp, -1, bytes(data)
+                        timestamp = float('nan')
+                        data = bytearray()
+                    # The hex groups are separated by single spaces and from the ASCII column by two
+                    data += bytes.fromhex(rest.strip().split(b'  ', 1)[0].decode('ascii'))
+                elif len(stripped) > 0:
+                    if len(data) > 0:
+                        yield timestamp, -1, bytes(data)
+                        data = bytearray()
+                    timestamp = parse_timestamp(line)
+            if len(data) > 0:
+                yield timestamp, -1, bytes(data)
+        finally:
+            close_map(mapped)
+
+
+##
+# Reads a pcap file (either byte order, microsecond or nanosecond timestamps) of Ethernet frames
+# Yields: (timestamp, offset, data) for each packet, with data a memoryview into the mapped file
+#
+def read_pcap(path):
+    with open(path, 'rb') as capture_file:
+        mapped = map_file(capture_file)
+        if mapped is None:
+            return
+        view = memoryview(mapped)
+        try:
+            byte_order, scale = pcap_format(mapped)
+            link_type = struct.unpack_from(byte_order + 'I', mapped, 20)[0]
+            if link_type != c.PCAP_LINKTYPE_ETHERNET:
+                raise ValueError('{}: unsupported link type {}'.format(path, link_type))
+
+            record_header = struct.Struct(byte_order + 'IIII')
+            offset = c.PCAP_GLOBAL_HEADER_LENGTH
+            while offset + c.PCAP_RECORD_HEADER_LENGTH <= len(mapped):
+                seconds, fraction, captured_length, _ = record_header.unpack_from(mapped, offset)
+                offset += c.PCAP_RECORD_HEADER_LENGTH
+                yield seconds + fraction * scale, offset, view[offset:offset + captured_length]
+                offset += captured_length
+        finally:
+            view.release()
+            close_map(mapped)
+
+
+##
+# Returns: (struct byte order, timestamp fraction scale) from the magic number of a pcap file, or None if the data does
+# not start with a pcap magic number
+#
+def pcap_format(data):
+    if len(data) < c.PCAP_GLOBAL_HEADER_LENGTH:
+        return None
+    for byte_order in ['<', '>']:
+        magic = struct.unpack_from(byte_order + 'I', data, 0)[0]
+        if magic == c.PCAP_MAGIC:
+            return byte_order, 1e-6
+        if magic == c.PCAP_MAGIC_NANOSECONDS:
+            return byte_order, 1e-9
+    return None
+
+
+##
+# Reads a capture, choosing the reader from the file's contents (pcap magic number or hex dump text)
+# Yields: (timestamp, offset, data) for each packet
+#
+def read_capture(path):
+    with open(path, 'rb') as capture_file:
+        header = capture_file.read(c.PCAP_GLOBAL_HEADER_LENGTH)
+    if pcap_format(header) is not None:
+        return read_pcap(path)
+    return read_hex_dump(path)
+
+
+##
+# Writes (timestamp, data) packets to a little-endian, microsecond pcap file of Ethernet frames
+# Returns: the number of packets written
+#
+def write_pcap(path, packets):
+    count = 0
+    with open(path, 'wb') as capture_file:
+        capture_file.write(struct.pack('<IHHiIII', c.PCAP_MAGIC, 2, 4, 0, 0, 65535, c.PCAP_LINKTYPE_ETHERNET))
+        for timestamp, data in packets:
+            seconds = int(timestamp)
+            microseconds = int(round((timestamp - seconds) * 1e6))
+            capture_file.write(struct.pack('<IIII', seconds, microseconds, len(data), len(data)))
+            capture_file.write(data)
+            count += 1
+    return count
+
+
+##
+# Writes (timestamp, data) packets as a tcpdump -tt -X hex dump: a summary line with the timestamp, then 16 bytes per
+# line as hex groups and ASCII
+# Returns: the number of packets written
+#
+def write_hex_dump(path, packets):
+    count = 0
+    with open(path, 'w') as capture_file:
+        for timestamp, data in packets:
+            capture_file.write('{:.6f} IP length {}\n'.format(timestamp, len(data)))
+            for line_offset in range(0, len(data), 16):
+                chunk = bytes(data[line_offset:line_offset + 16])
+                groups = ' '.join(chunk[i:i + 2].hex() for i in range(0, len(chunk), 2))
+                text = ''.join(chr(b) if 32 <= b < 127 else '.' for b in chunk)
+                capture_file.write('\t0x{:04x}:  {:<40} {}\n'.format(line_offset, groups, text))
+            count += 1
+    return count
@@ -0,0 +1,90 @@
+# Internet checksums (RFC 1071), for single packets and vectorized over matrices of packets
+# A header is valid when the ones' complement sum of its 16-bit words, checksum included, is 0xffff
+
+import struct
+
+import numpy as np
+
+from . import constants as c
+
+
+# Returns the Internet checksum (ones' complement of the ones' complement sum of 16-bit words) of data
+def internet_checksum(data):
+    if len(data) % 2 == 1:
+        data += b'\x00'
+    total = sum(struct.unpack('!{}H'.format(len(data) // 2), data))
+    while total > 0xffff:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
+
+
+# Returns the big-endian 16-bit words of each row of a uint8 matrix (padded with a zero byte if its width is odd)
+def words(matrix):
+    if matrix.shape[1] % 2 == 1:
+        matrix = np.pad(matrix, ((0, 0), (0, 1)))
+    return np.ascontiguousarray(matrix).view('>u2')
+
+
+# Returns the sums of the 16-bit words in each row of a uint8 matrix, counting only the words before each row's entry
+# in ends (a number of words)
+def word_sums(matrix, ends):
+    row_words = words(matrix)
+    return np.where(np.arange(row_words.shape[1]) < ends[:, None], row_words, 0).sum(axis=1, dtype=np.uint64)
+
+
+# Returns the ones' complement sums of an array of (unfolded) sums, with the carries folded back into 16 bits
+def fold(totals):
+    totals = totals.astype(np.uint64)
+    while np.any(totals > 0xffff):
+        totals = (totals & 0xffff) + (totals >> 16)
+    return totals
+
+
+# Returns the status of each sum: valid if it is 0xffff, invalid otherwise
+def sum_status(totals):
+    return np.where(fold(totals) == 0xffff, c.CHECKSUM_VALID, c.CHECKSUM_INVALID)
+
+
+# Returns the checksum status (CHECKSUM_*) of the IPv4 header of each packet
+# matrix holds the leading bytes of each packet (at least the Ethernet header and a maximal IPv4 header) and records
+# the packets' decoded headers
+def ip_checksum_status(matrix, records):
+    header_length = records['ip_header_length'].astype(np.int64)
+    header = matrix[:, c.ETHERNET_HEADER_LENGTH:c.ETHERNET_HEADER_LENGTH + 60]
+    status = sum_status(word_sums(header, header_length // 2))
+
+    truncated = records['length'] < c.ETHERNET_HEADER_LENGTH + header_length
+    return np.where(header_length == 0, c.CHECKSUM_UNCHECKED, np.where(truncated, c.CHECKSUM_TRUNCATED, status))
+
+
+# Returns the checksum status (CHECKSUM_*) of the TCP or UDP segment of each packet
+# The checksum covers the IPv4 pseudo-header (addresses, protocol and segment length) and the whole segment, so matrix
+# must hold every captured byte of the packets, zero-padded
+# The segment runs to the end of most packets, so each row is summed whole and the words of the Ethernet and IPv4
+# headers in front of the segment are subtracted; only packets with bytes after the segment (Ethernet padding) are
+# masked byte by byte
+def l4_checksum_status(matrix, records):
+    segment_start = c.ETHERNET_HEADER_LENGTH + records['ip_header_length'].astype(np.int64)
+    segment_end = c.ETHERNET_HEADER_LENGTH + records['ip_total_length'].astype(np.int64)
+    # The segment starts at an even offset (the Ethernet and IPv4 header lengths are even), so its words line up
+    # with the matrix's
+    totals = words(matrix).sum(axis=1, dtype=np.uint64)
+    prefix = matrix[:, :c.ETHERNET_HEADER_LENGTH + 60]
+    totals -= word_sums(prefix, segment_start // 2)
+
+    padded = np.flatnonzero(records['length'] > segment_end)
+    if len(padded) > 0:
+        columns = np.arange(matrix.shape[1])
+        in_segment = (columns >= segment_start[padded, None]) & (columns < segment_end[padded, None])
+        totals[padded] = words(np.where(in_segment, matrix[padded], 0)).sum(axis=1, dtype=np.uint64)
+
+    source = records['ip_src'].astype(np.uint64)
+    destination = records['ip_dst'].astype(np.uint64)
+    pseudo_header = (source >> 16) + (source & 0xffff) + (destination >> 16) + (destination & 0xffff) + \
+        records['ip_protocol'] + (segment_end - segment_start).astype(np.uint64)
+    status = sum_status(totals + pseudo_header)
+
+    unchecked = (records['payload_offset'] == 0) | \
+        ((records['ip_protocol'] == c.PROTOCOL_UDP) & (records['l4_checksum'] == 0))
+    truncated = records['length'] < segment_end
+    return np.where(unchecked, c.CHECKSUM_UNCHECKED, np.where(truncated, c.CHECKSUM_TRUNCATED, status))
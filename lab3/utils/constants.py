@@ -0,0 +1,49 @@
+# Constants for Lab 3
+
+# Ethernet II
+ETHERNET_HEADER_LENGTH = 14
+ETHERTYPE_IPV4 = 0x0800
+
+# IPv4 protocol numbers
+PROTOCOL_TCP = 6
+PROTOCOL_UDP = 17
+
+# TLS record content types
+TLS_CHANGE_CIPHER_SPEC = 20
+TLS_ALERT = 21
+TLS_HANDSHAKE = 22
+TLS_APPLICATION_DATA = 23
+
+# TCP flag bits
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_PSH = 0x08
+TCP_ACK = 0x10
+TCP_URG = 0x20
+
+# Number of leading bytes of each packet copied into the header matrix; enough for Ethernet, a maximal IPv4 header
+# (60 bytes), a maximal TCP header (60 bytes) and a TLS record header
+HEADER_BYTES = 144
+
+# Number of packets decoded per block
+BLOCK_SIZE = 65536
+
+# pcap file magic numbers (microsecond and nanosecond timestamps), as read in little-endian order
+PCAP_MAGIC = 0xa1b2c3d4
+PCAP_MAGIC_NANOSECONDS = 0xa1b23c4d
+PCAP_LINKTYPE_ETHERNET = 1
+PCAP_GLOBAL_HEADER_LENGTH = 24
+PCAP_RECORD_HEADER_LENGTH = 16
+
+# Checksum verification status of a decoded header: not checked (not decoded with checksums, no such header, or a UDP
+# checksum of 0, which the sender did not compute), valid, invalid, or not verifiable because the packet was captured
+# shorter than the bytes the checksum covers
+CHECKSUM_UNCHECKED = 0
+CHECKSUM_VALID = 1
+CHECKSUM_INVALID = 2
+CHECKSUM_TRUNCATED = 3
+
+# Largest whole-packet matrix built at once when verifying TCP/UDP checksums; blocks of long packets are verified a
+# few rows at a time so memory stays bounded
+CHECKSUM_BLOCK_BYTES = 1 << 24
@@ -0,0 +1,228 @@
+# Vectorized Ethernet/IPv4/TCP/UDP/TLS header decoder
+# Packets are decoded a block at a time: the first HEADER_BYTES bytes of each packet are copied into a uint8 matrix and
+# every header field of the block is extracted with array operations into a structured array of header records
+
+from operator import attrgetter
+
+import numpy as np
+
+from . import capture, checksum, constants as c
+
+# One record per packet; fields of headers a packet does not have are 0
+HEADER_DTYPE = np.dtype([
+    ('timestamp', np.float64),      # Capture timestamp in seconds (nan if the capture has none)
+    ('offset', np.int64),           # Byte offset of the packet in a pcap file (-1 for hex dumps)
+    ('length', np.uint32),          # Captured length of the packet
+    ('eth_dst', np.uint8, (6,)),
+    ('eth_src', np.uint8, (6,)),
+    ('ethertype', np.uint16),
+    ('ip_header_length', np.uint8),
+    ('ip_total_length', np.uint16),
+    ('ip_id', np.uint16),
+    ('ip_flags_fragment', np.uint16),
+    ('ip_ttl', np.uint8),
+    ('ip_protocol', np.uint8),
+    ('ip_checksum', np.uint16),
+    ('ip_src', np.uint32),
+    ('ip_dst', np.uint32),
+    ('src_port', np.uint16),
+    ('dst_port', np.uint16),
+    ('tcp_seq', np.uint32),
+    ('tcp_ack', np.uint32),
+    ('tcp_header_length', np.uint8),
+    ('tcp_flags', np.uint16),
+    ('tcp_window', np.uint16),
+    ('l4_checksum', np.uint16),     # TCP or UDP checksum
+    ('payload_offset', np.uint16),  # Offset of the TCP/UDP payload from the start of the packet
+    ('payload_length', np.uint32),
+    ('tls_type', np.uint8),         # Content type of a TLS record starting the payload
+    ('tls_version', np.uint16),
+    ('tls_length', np.uint16),
+    ('ip_checksum_status', np.uint8),   # CHECKSUM_* status, set when decoded with checksums=True
+    ('l4_checksum_status', np.uint8)
+])
+
+
+##
+# Copies the first width bytes of each packet into a zero-padded uint8 matrix
+# Packets that are all memoryviews into the same mapped pcap file are copied straight out of the mapping, one row per
+# packet, through a sliding window view of the file; other packets are joined one at a time
+# Parameters: datas -> the packet bytes
+#             offsets -> the packets' byte offsets in the file (-1 for hex dumps)
+#             width -> the number of bytes copied per packet
+# Returns: (matrix, captured lengths)
+#
+def header_matrix(datas, offsets, width=c.HEADER_BYTES):
+    lengths = np.fromiter(map(len, datas), dtype=np.int64, count=len(datas))
+
+    try:
+        buffers = set(map(attrgetter('obj'), datas))
+    except AttributeError:
+        buffers = None
+    if buffers is not None and len(buffers) == 1 and offsets.min() >= 0:
+        file_bytes = np.frombuffer(buffers.pop(), dtype=np.uint8)
+        if len(file_bytes) >= width:
+            # Packets too close to the end of the file for a full window are copied one at a time
+            in_window = offsets + width <= len(file_bytes)
+            windows = np.lib.stride_tricks.sliding_window_view(file_bytes, width)
+            matrix = windows[np.where(in_window, offsets, 0)]
+            for row in np.flatnonzero(~in_window).tolist():
+                matrix[row] = 0
+                matrix[row, :lengths[row]] = file_bytes[offsets[row]:offsets[row] + lengths[row]]
+            matrix[np.arange(width) >= lengths[:, None]] = 0
+            return matrix, lengths
+
+    padding = b'\x00' * width
+    joined = b''.join(bytes(data[:width]) + padding[:max(0, width - length)]
+                      for data, length in zip(datas, lengths.tolist()))
+    return np.frombuffer(joined, dtype=np.uint8).reshape(len(datas), width), lengths
+
+
+##
+# Returns: the big-endian unsigned integers in the columns of a (packets, width) uint8 array
+#
+def big_endian(columns):
+    values = columns[:, 0].astype(np.uint32)
+    for i in range(1, columns.shape[1]):
+        values = (values << 8) | columns[:, i]
+    return values
+
+
+##
+# Returns: the width bytes starting at each row's offset into the matrix, as a (packets, width) array (offsets are
+# clipped to the matrix, which HEADER_BYTES is large enough to make unnecessary for well-formed headers)
+#
+def gather(matrix, offsets, width):
+    columns = np.minimum(offsets[:, None] + np.arange(width), matrix.shape[1] - 1)
+    return np.take_along_axis(matrix, columns, axis=1)
+
+
+##
+# Verifies the IPv4 and TCP/UDP checksums of a decoded block of packets, setting the records' checksum statuses
+# The TCP/UDP checksums cover whole packets, so the packets are copied into full-width matrices, enough rows at a time
+# to keep each matrix within CHECKSUM_BLOCK_BYTES
+#
+def verify_checksums(records, datas):
+    width = max(int(records['length'].max()), c.ETHERNET_HEADER_LENGTH + 60)
+    rows = max(1, c.CHECKSUM_BLOCK_BYTES // width)
+    for start in range(0, len(records), rows):
+        block = records[start:start + rows]
+        matrix, _ = header_matrix(datas[start:start + rows], block['offset'], width)
+        block['ip_checksum_status'] = checksum.ip_checksum_status(matrix, block)
+        block['l4_checksum_status'] = checksum.l4_checksum_status(matrix, block)
+
+
+##
+# Decodes a block of (timestamp, offset, data) packets
+# Parameters: packets -> the packets
+#             checksums -> whether to verify the IPv4 and TCP/UDP checksums (slower, as the whole packets are read)
+# Returns: a structured array of HEADER_DTYPE records, one per packet
+#
+def decode_block(packets, checksums=False):
+    records = np.zeros(len(packets), dtype=HEADER_DTYPE)
+    if len(packets) == 0:
+        return records
+    timestamps, offsets, datas = zip(*packets)
+    records['timestamp'] = timestamps
+    records['offset'] = offsets
+
+    matrix, lengths = header_matrix(datas, records['offset'])
+    records['length'] = lengths
+    records['eth_dst'] = matrix[:, 0:6]
+    records['eth_src'] = matrix[:, 6:12]
+    ethertype = big_endian(matrix[:, 12:14])
+    records['ethertype'] = ethertype
+
+    # IPv4 header (fixed offsets)
+    ip = matrix[:, c.ETHERNET_HEADER_LENGTH:c.ETHERNET_HEADER_LENGTH + 20]
+    ipv4 = (ethertype == c.ETHERTYPE_IPV4) & (ip[:, 0] >> 4 == 4) & (lengths >= c.ETHERNET_HEADER_LENGTH + 20)
+    ip_header_length = np.where(ipv4, (ip[:, 0] & 0x0f).astype(np.int64) * 4, 0)
+    ip_total_length = np.where(ipv4, big_endian(ip[:, 2:4]), 0)
+    flags_fragment = big_endian(ip[:, 6:8])
+    protocol = np.where(ipv4, ip[:, 9], 0)
+    records['ip_header_length'] = ip_header_length
+    records['ip_total_length'] = ip_total_length
+    records['ip_id'] = np.where(ipv4, big_endian(ip[:, 4:6]), 0)
+    records['ip_flags_fragment'] = np.where(ipv4, flags_fragment, 0)
+    records['ip_ttl'] = np.where(ipv4, ip[:, 8], 0)
+    records['ip_protocol'] = protocol
+    records['ip_checksum'] = np.where(ipv4, big_endian(ip[:, 10:12]), 0)
+    records['ip_src'] = np.where(ipv4, big_endian(ip[:, 12:16]), 0)
+    records['ip_dst'] = np.where(ipv4, big_endian(ip[:, 16:20]), 0)
+
+    # TCP and UDP headers start after the (variable length) IPv4 header; fragments after the first have none
+    transport_offset = c.ETHERNET_HEADER_LENGTH + ip_header_length
+    transport = gather(matrix, transport_offset, 20)
+    first_fragment = (flags_fragment & 0x1fff) == 0
+    tcp = ipv4 & first_fragment & (protocol == c.PROTOCOL_TCP)
+    udp = ipv4 & first_fragment & (protocol == c.PROTOCOL_UDP)
+    tcp_or_udp = tcp | udp
+    records['src_port'] = np.where(tcp_or_udp, big_endian(transport[:, 0:2]), 0)
+    records['dst_port'] = np.where(tcp_or_udp, big_endian(transport[:, 2:4]), 0)
+    records['tcp_seq'] = np.where(tcp, big_endian(transport[:, 4:8]), 0)
+    records['tcp_ack'] = np.where(tcp, big_endian(transport[:, 8:12]), 0)
+    tcp_header_length = np.where(tcp, (transport[:, 12] >> 4).astype(np.int64) * 4, 0)
+    records['tcp_header_length'] = tcp_header_length
+    records['tcp_flags'] = np.where(tcp, big_endian(transport[:, 12:14]) & 0x01ff, 0)
+    records['tcp_window'] = np.where(tcp, big_endian(transport[:, 14:16]), 0)
+    records['l4_checksum'] = np.where(tcp, big_endian(transport[:, 16:18]),
+                                      np.where(udp, big_endian(transport[:, 6:8]), 0))
+
+    # Payload, and a TLS record header at its start (content type 20-23 and major version 3)
+    transport_header_length = np.where(tcp, tcp_header_length, np.where(udp, 8, 0))
+    payload_offset = np.where(tcp_or_udp, transport_offset + transport_header_length, 0)
+    payload_length = np.where(tcp_or_udp, ip_total_length.astype(np.int64) - ip_header_length - transport_header_length,
+                              0)
+    records['payload_offset'] = payload_offset
+    records['payload_length'] = np.maximum(payload_length, 0)
+
+    tls_header = gather(matrix, payload_offset, 5)
+    tls_type = tls_header[:, 0]
+    tls = tcp & (payload_length >= 5) & (tls_type >= c.TLS_CHANGE_CIPHER_SPEC) & \
+        (tls_type <= c.TLS_APPLICATION_DATA) & (tls_header[:, 1] == 3)
+    records['tls_type'] = np.where(tls, tls_type, 0)
+    records['tls_version'] = np.where(tls, big_endian(tls_header[:, 1:3]), 0)
+    records['tls_length'] = np.where(tls, big_endian(tls_header[:, 3:5]), 0)
+
+    if checksums:
+        verify_checksums(records, datas)
+    return records
+
+
+##
+# Decodes a capture file (pcap or hex dump) a block of packets at a time
+# Yields: a structured array of HEADER_DTYPE records for each block of up to block_size packets
+#
+def decode_capture(path, block_size=c.BLOCK_SIZE, checksums=False):
+    block = []
+    for packet in capture.read_capture(path):
+        block.append(packet)
+        if len(block) == block_size:
+            yield decode_block(block, checksums)
+            block = []
+    if len(block) > 0:
+        yield decode_block(block, checksums)
+
+
+##
+# Returns: a MAC address record field as a colon-separated string
+#
+def format_mac(mac):
+    return ':'.join('{:02x}'.format(int(b)) for b in mac)
+
+
+##
+# Returns: an IPv4 address record field as a dotted-quad string
+#
+def format_ip(address):
+    address = int(address)
+    return '.'.join(str((address >> shift) & 0xff) for shift in [24, 16, 8, 0])
+
+
+##
+# Returns: TCP flag bits as tcpdump-style letters (e.g. 'P.' for PSH + ACK)
+#
+def format_tcp_flags(flags):
+    letters = [(c.TCP_SYN, 'S'), (c.TCP_FIN, 'F'), (c.TCP_RST, 'R'), (c.TCP_PSH, 'P'), (c.TCP_URG, 'U'),
+               (c.TCP_ACK, '.')]
+    return ''.join(letter for bit, letter in letters if flags & bit) or 'none'
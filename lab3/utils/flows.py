@@ -0,0 +1,165 @@
+# Flow table: packets grouped by their 5-tuple (addresses, ports and protocol), with per-flow packet and byte counts
+# and inter-arrival time statistics
+# Blocks of decoded header records are added at a time: each block is sorted by 5-tuple, its distinct 5-tuples are
+# looked up in a dict (the only per-flow Python work) and the per-flow sums are taken with array operations
+
+import numpy as np
+
+from . import constants as c
+
+FLOW_KEY_FIELDS = ['ip_src', 'ip_dst', 'src_port', 'dst_port', 'ip_protocol']
+
+# One record per flow; the inter-arrival statistics only count packets with capture timestamps
+FLOW_DTYPE = np.dtype([
+    ('ip_src', np.uint32),
+    ('ip_dst', np.uint32),
+    ('src_port', np.uint16),
+    ('dst_port', np.uint16),
+    ('ip_protocol', np.uint8),
+    ('packets', np.int64),
+    ('bytes', np.int64),            # Captured bytes, Ethernet headers included
+    ('payload_bytes', np.int64),    # TCP/UDP payload bytes
+    ('first', np.float64),          # Timestamps of the first and last packets
+    ('last', np.float64),
+    ('gaps', np.int64),             # Number of inter-arrival times
+    ('gap_sum', np.float64),
+    ('gap_sum_squares', np.float64),
+    ('gap_min', np.float64),
+    ('gap_max', np.float64)
+])
+
+
+##
+# Swaps the source and destination of the records whose source (address, port) is greater than their destination's,
+# so both directions of a connection have the same 5-tuple
+# Returns: the flow key columns
+#
+def bidirectional_keys(records):
+    keys = {field: records[field] for field in FLOW_KEY_FIELDS}
+    swap = (records['ip_src'] > records['ip_dst']) | \
+        ((records['ip_src'] == records['ip_dst']) & (records['src_port'] > records['dst_port']))
+    for source, destination in [('ip_src', 'ip_dst'), ('src_port', 'dst_port')]:
+        keys[source], keys[destination] = np.where(swap, keys[destination], keys[source]), \
+            np.where(swap, keys[source], keys[destination])
+    return keys
+
+
+class FlowTable:
+    ##
+    # Parameters: bidirectional -> whether both directions of a connection are counted as one flow (keyed by the
+    #                              lower address and port first)
+    #
+    def __init__(self, bidirectional=False):
+        self.bidirectional = bidirectional
+        self.index = {}
+        self.flows = np.zeros(1024, dtype=FLOW_DTYPE)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    ##
+    # Returns: the flow numbers of the given 5-tuples, adding new flows to the table
+    # Parameters: keys -> the flows' 5-tuple columns
+    #             packed -> the 5-tuples packed into pairs of ints, used as the dict keys
+    #
+    def lookup(self, keys, packed):
+        numbers = np.empty(len(packed), dtype=np.int64)
+        for i, key in enumerate(packed):
+            number = self.index.get(key)
+            if number is None:
+                number = self.index[key] = self.count
+                if self.count == len(self.flows):
+                    self.flows = np.concatenate([self.flows, np.zeros(len(self.flows), dtype=FLOW_DTYPE)])
+                for field in FLOW_KEY_FIELDS:
+                    self.flows[field][number] = keys[field][i]
+                for field, value in [('first', np.nan), ('last', np.nan), ('gap_min', np.inf), ('gap_max', -np.inf)]:
+                    self.flows[field][number] = value
+                self.count += 1
+            numbers[i] = number
+        return numbers
+
+    ##
+    # Adds a block of decoded header records; packets without a TCP or UDP header are skipped
+    # Packets are assumed to be in capture order, both within and across blocks
+    #
+    def add(self, records):
+        records = records[records['payload_offset'] > 0]
+        if len(records) == 0:
+            return
+
+        # Group the packets by 5-tuple, packed into two 64-bit ints (addresses, and ports and protocol); the sort is
+        # stable, so each group is in capture order
+        keys = bidirectional_keys(records) if self.bidirectional else records
+        addresses = (keys['ip_src'].astype(np.uint64) << 32) | keys['ip_dst']
+        ports = (keys['src_port'].astype(np.uint64) << 24) | (keys['dst_port'].astype(np.uint64) << 8) | \
+            keys['ip_protocol']
+        order = np.lexsort((ports, addresses))
+        addresses = addresses[order]
+        ports = ports[order]
+        starts = np.flatnonzero(np.r_[True, (addresses[1:] != addresses[:-1]) | (ports[1:] != ports[:-1])])
+
+        # Look the groups up in order of their first packets, so new flows are numbered in order of first appearance
+        # whatever the block size
+        appearance = np.argsort(order[starts])
+        first_starts = starts[appearance]
+        first_packets = order[first_starts]
+        group_numbers = np.empty(len(starts), dtype=np.int64)
+        group_numbers[appearance] = self.lookup({field: keys[field][first_packets] for field in FLOW_KEY_FIELDS},
+                                                list(zip(addresses[first_starts].tolist(),
+                                                         ports[first_starts].tolist())))
+        sorted_numbers = np.repeat(group_numbers, np.diff(np.r_[starts, len(order)]))
+
+        flows = self.flows[:self.count]
+        flows['packets'] += np.bincount(sorted_numbers, minlength=self.count)
+        flows['bytes'] += np.bincount(sorted_numbers, records['length'][order], minlength=self.count).astype(np.int64)
+        flows['payload_bytes'] += np.bincount(sorted_numbers, records['payload_length'][order],
+                                              minlength=self.count).astype(np.int64)
+
+        timestamps = records['timestamp'][order]
+        timed = ~np.isnan(timestamps)
+        if not np.any(timed):
+            return
+        # A flow's gaps are the differences between its consecutive timestamps, starting from the last timestamp of
+        # its previous blocks
+        sorted_numbers = sorted_numbers[timed]
+        timestamps = timestamps[timed]
+        starts = np.flatnonzero(np.r_[True, sorted_numbers[1:] != sorted_numbers[:-1]])
+        block_numbers = sorted_numbers[starts]
+
+        previous = flows['last'][block_numbers]
+        seen = ~np.isnan(previous)
+        same_flow = sorted_numbers[1:] == sorted_numbers[:-1]
+        gap_numbers = np.concatenate([sorted_numbers[1:][same_flow], block_numbers[seen]])
+        gaps = np.concatenate([np.diff(timestamps)[same_flow], timestamps[starts][seen] - previous[seen]])
+
+        flows['first'][block_numbers[~seen]] = timestamps[starts][~seen]
+        flows['last'][block_numbers] = timestamps[np.r_[starts[1:], len(timestamps)] - 1]
+        flows['gaps'] += np.bincount(gap_numbers, minlength=self.count)
+        flows['gap_sum'] += np.bincount(gap_numbers, gaps, minlength=self.count)
+        flows['gap_sum_squares'] += np.bincount(gap_numbers, gaps * gaps, minlength=self.count)
+        np.minimum.at(flows['gap_min'], gap_numbers, gaps)
+        np.maximum.at(flows['gap_max'], gap_numbers, gaps)
+
+    ##
+    # Returns: the flow records, in order of first appearance
+    #
+    def table(self):
+        return self.flows[:self.count].copy()
+
+
+##
+# Returns: the mean and standard deviation of each flow's inter-arrival times (nan for flows with fewer than 1 or 2)
+#
+def gap_statistics(flows):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = flows['gap_sum'] / flows['gaps']
+        variance = (flows['gap_sum_squares'] - flows['gaps'] * mean * mean) / (flows['gaps'] - 1)
+    return mean, np.sqrt(np.maximum(variance, 0))
+
+
+##
+# Returns: the protocol name of a flow record
+#
+def protocol_name(protocol):
+    return {c.PROTOCOL_TCP: 'TCP', c.PROTOCOL_UDP: 'UDP'}.get(int(protocol), str(protocol))
@@ -0,0 +1,58 @@
+# Synthetic Ethernet/IPv4/TCP captures with TLS payloads, for benchmarks
+
+import struct
+
+import numpy as np
+
+from . import checksum, constants as c
+
+
+# Returns an Ethernet frame holding an IPv4/TCP packet with valid IP and TCP checksums
+# flow is (source MAC, destination MAC, source IP, destination IP, source port, destination port), with the MACs as
+# 6-byte strings and the IPs as ints; the payload starts with a TLS record header if tls_type is given
+def make_packet(flow, sequence, ip_id, payload_length, tls_type=None):
+    source_mac, destination_mac, source_ip, destination_ip, source_port, destination_port = flow
+
+    payload = b''
+    if tls_type is not None and payload_length >= 5:
+        payload = struct.pack('!BHH', tls_type, 0x0303, payload_length - 5)
+    payload += b'\x00' * (payload_length - len(payload))
+
+    # TCP header with the timestamp option (32 bytes), like the packets in the lab captures
+    tcp_header = struct.pack('!HHIIBBHHH', source_port, destination_port, sequence, 0, 8 << 4, c.TCP_ACK | c.TCP_PSH,
+                             501, 0, 0) + b'\x01\x01\x08\x0a' + struct.pack('!II', sequence, 0)
+    tcp_length = len(tcp_header) + payload_length
+    pseudo_header = struct.pack('!IIBBH', source_ip, destination_ip, 0, c.PROTOCOL_TCP, tcp_length)
+    tcp_checksum = checksum.internet_checksum(pseudo_header + tcp_header + payload)
+    tcp_header = tcp_header[:16] + struct.pack('!H', tcp_checksum) + tcp_header[18:]
+
+    total_length = 20 + len(tcp_header) + payload_length
+    ip_header = struct.pack('!BBHHHBBHII', 0x45, 0, total_length, ip_id, 0x4000, 64, c.PROTOCOL_TCP, 0, source_ip,
+                            destination_ip)
+    ip_header = ip_header[:10] + struct.pack('!H', checksum.internet_checksum(ip_header)) + ip_header[12:]
+
+    ethernet_header = destination_mac + source_mac + struct.pack('!H', c.ETHERTYPE_IPV4)
+    return ethernet_header + ip_header + tcp_header + payload
+
+
+# Yields count (timestamp, data) packets spread over the given number of flows, with exponential inter-arrival times
+# (mean_gap seconds) and uniformly distributed payload lengths, mostly TLS application data
+def synthetic_packets(count, flows=64, mean_gap=1e-4, max_payload=1400, seed=None):
+    rng = np.random.default_rng(seed)
+    flow_table = []
+    for i in range(flows):
+        source_mac = bytes(rng.integers(0, 256, 6, dtype=np.uint8))
+        destination_mac = bytes(rng.integers(0, 256, 6, dtype=np.uint8))
+        source_ip, destination_ip = (int(ip) for ip in rng.integers(0, 2 ** 32, 2, dtype=np.uint64))
+        flow_table.append((source_mac, destination_mac, source_ip, destination_ip, int(rng.integers(1024, 65536)), 443))
+
+    sequences = [0] * flows
+    tls_types = [c.TLS_APPLICATION_DATA] * 8 + [c.TLS_HANDSHAKE, None]
+    timestamp = 1573311111.0
+    for i in range(count):
+        flow = int(rng.integers(0, flows))
+        payload_length = int(rng.integers(0, max_payload + 1))
+        timestamp += rng.exponential(mean_gap)
+        tls_type = tls_types[int(rng.integers(0, len(tls_types)))] if payload_length > 0 else None
+        yield timestamp, make_packet(flow_table[flow], sequences[flow], i & 0xffff, payload_length, tls_type)
+        sequences[flow] = (sequences[flow] + payload_length) & 0xffffffff